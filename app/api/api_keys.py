@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, status, Request
 import uuid
 from datetime import datetime
 from httpx import request
-from app.core.security import get_current_user
+from app.core.security import get_current_user, invalidate_api_key
 from app.core.config import get_settings
 from app.core.firebase import get_firebase_manager
 from pydantic import BaseModel
@@ -80,6 +80,7 @@ def revoke_api_key(api_key: str, current_user: dict = Depends(get_current_user))
             'revoked_at': datetime.utcnow(),
             'revoked_by': current_user.get('email')
         })
+        invalidate_api_key(api_key)
         
         return {"message": "API key revoked successfully"}
     except HTTPException:
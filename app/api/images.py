@@ -1,16 +1,16 @@
-import asyncio
-import uuid
-from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Query, Response
+from app.core.base64_chunks import WHITESPACE, base64_to_chunks, decoded_base64_length, image_to_base64, is_valid_base64
 from app.core.security import get_auth
+from app.core.uploads import read_image_upload
 from app.services.pairing_service import PairingService, get_pairing_service
-import base64
-import json
-import requests
+from app.services.pairing_jobs import PairingJobManager, get_pairing_job_manager
+from app.services.encryption_service import EncryptionService, get_encryption_service
 from app.core.config import get_settings
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from fastapi import status
 from datetime import datetime
+from typing import List, Optional
 
 class DecryptionsBody(BaseModel):
     key_id: str
@@ -18,86 +18,36 @@ class DecryptionsBody(BaseModel):
     iv: str
 
 router = APIRouter(prefix="/images", tags=["images"])
+settings = get_settings()
 
 @router.post("/pairs")
 async def pair_images(
     image: UploadFile = File(...),
     keyword: str = Form(...),    
     include_faces: bool = Form(False),
+    candidates: int = Form(1),
     auth: dict = Depends(get_auth),
     pairing_service: PairingService = Depends(get_pairing_service),
 ):
     """
     Pair an uploaded image with a web image based on Vision AI analysis and keyword.
+    With candidates > 1, the top search results are scored and the best match is kept.
     """
-
-    def log_timestamp(step):
-        print(f"[{datetime.now()}] Completed: {step}")
-
-    if not image.content_type.startswith('image/'):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be an image")
+    # Read the uploaded image in bounded chunks, hashing and sniffing its type
+    with pairing_service.stage("read"):
+        upload = await read_image_upload(image, settings.UPLOAD_MAX_BYTES, settings.UPLOAD_CHUNK_SIZE)
 
     try:
-        # Read the uploaded image
-        content = await image.read()
-        log_timestamp("Reading uploaded image")
-
-        # Initialize lists for labels, colors, and faces
-        original_labels, original_colors, original_faces = [], [], []
-
-        # Analyze the original image 
-        original_labels, original_colors, original_faces = await pairing_service.analyze_image(content, include_faces)
-        log_timestamp("Analyzing original image")
-        
-        # Combine keyword with labels, colors, and faces for search
-        search_term = pairing_service.build_search_term(keyword, original_labels, original_colors)
-        log_timestamp("Building search term")
-        
-        # Search for matching image
-        result_image_url = await pairing_service.search_image(search_term)
-        log_timestamp("Searching matching image")
-        print(result_image_url)
-
-        # Run storage and analysis tasks concurrently
-        store_task = pairing_service.store_image_to_storage(content)
-        analyze_task = pairing_service.analyze_image_from_uri(result_image_url, include_faces)
-        
-        # Wait for both tasks to complete
-        (original_uri), (result_labels, result_colors, result_faces) = await asyncio.gather(
-            store_task,
-            analyze_task
-        )
-        log_timestamp("Storage and analysis tasks")
-
-        # Calculate percentage match
-        label_match, color_match, face_match, overall_match = pairing_service.calculate_percentage_match(
-            original_labels=original_labels,
-            original_colors=original_colors,
-            original_faces=original_faces,
-            result_labels=result_labels,
-            result_colors=result_colors,
-            result_faces=result_faces
+        # Preprocess, analyze, search, store and score
+        result = await pairing_service.pair_image(
+            content=upload.content,
+            content_type=upload.content_type,
+            keyword=keyword,
+            include_faces=include_faces,
+            candidates=candidates,
+            auth=auth,
+            digest=upload.digest
         )
-        log_timestamp("Calculating percentage match")
-                 
-        # Store pairing record
-        result = pairing_service.store_pairing_record(
-            original_image_uri=original_uri,
-            original_keyword=keyword,
-            result_image_uri=result_image_url,
-            original_labels=original_labels,
-            original_colors=original_colors,
-            original_faces=original_faces,
-            result_labels=result_labels,
-            result_colors=result_colors,
-            result_faces=result_faces,
-            label_match=label_match,
-            color_match=color_match,
-            face_match=face_match,
-            overall_match=overall_match,
-            auth=auth
-        )
-        log_timestamp("Storing pairing record")
         
         return {
             'id': result['id'],
@@ -117,54 +67,161 @@ async def pair_images(
             detail=f"Error processing image pair: {str(e)}"
         )
     
+@router.post("/pairs/batch")
+async def pair_images_batch(
+    images: List[UploadFile] = File(...),
+    keywords: List[str] = Form(...),
+    include_faces: bool = Form(False),
+    candidates: int = Form(1),
+    auth: dict = Depends(get_auth),
+    pairing_service: PairingService = Depends(get_pairing_service),
+):
+    """
+    Pair many uploaded images in one request. Send one keyword per image, or a single
+    keyword shared by all. Returns a result or an error for each image, in upload order.
+    """
+    if len(images) > settings.PAIRING_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.PAIRING_BATCH_MAX_IMAGES} images can be paired per request"
+        )
+    if len(keywords) == 1:
+        keywords = keywords * len(images)
+    if len(keywords) != len(images):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide one keyword per image or a single keyword for all images"
+        )
+
+    # Reject invalid uploads individually instead of failing the whole batch
+    results = [None] * len(images)
+    items, positions = [], []
+    for index, (image, keyword) in enumerate(zip(images, keywords)):
+        try:
+            upload = await read_image_upload(image, settings.UPLOAD_MAX_BYTES, settings.UPLOAD_CHUNK_SIZE)
+        except HTTPException as e:
+            results[index] = {'index': index, 'status': 'error', 'error': e.detail}
+            continue
+        items.append((upload, keyword))
+        positions.append(index)
+
+    try:
+        if items:
+            paired = await pairing_service.pair_images_batch(items, include_faces, candidates, auth)
+            for index, result in zip(positions, paired):
+                results[index] = {**result, 'index': index}
+        return {'results': results}
+
+    except Exception as e:
+        print(f"[{datetime.now()}] Error occurred: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing image pairs: {str(e)}"
+        )
+
+@router.post("/pairs/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_pairing_job(
+    response: Response,
+    image: UploadFile = File(...),
+    keyword: str = Form(...),
+    include_faces: bool = Form(False),
+    candidates: int = Form(1),
+    auth: dict = Depends(get_auth),
+    job_manager: PairingJobManager = Depends(get_pairing_job_manager),
+):
+    """
+    Queue an image pairing and return its job ID immediately.
+    Poll GET /images/pairs/jobs/{job_id} for the status and result.
+    """
+    upload = await read_image_upload(image, settings.UPLOAD_MAX_BYTES, settings.UPLOAD_CHUNK_SIZE)
+    job = await job_manager.submit(
+        content=upload.content,
+        content_type=upload.content_type,
+        keyword=keyword,
+        include_faces=include_faces,
+        candidates=candidates,
+        auth=auth,
+        digest=upload.digest
+    )
+    response.headers["Location"] = f"{settings.API_V1_STR}/images/pairs/jobs/{job.id}"
+    return job.to_dict()
+
+@router.get("/pairs/jobs/{job_id}")
+async def get_pairing_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=settings.PAIRING_JOB_MAX_WAIT_SECONDS),
+    auth: dict = Depends(get_auth),
+    job_manager: PairingJobManager = Depends(get_pairing_job_manager),
+):
+    """
+    Get the status of a pairing job. With wait > 0, hold the request up to that
+    many seconds for the job to finish.
+    """
+    return await job_manager.get(job_id, auth, wait)
+
 @router.get("/pairs")
 async def get_pairing_records(
+    response: Response,
+    limit: int = Query(settings.PAIRING_PAGE_SIZE, ge=1, le=settings.PAIRING_MAX_PAGE_SIZE),
+    start_after: Optional[str] = Query(None),
+    scope: str = Query("key", pattern="^(key|client)$"),
     auth: dict = Depends(get_auth),
     pairing_service: PairingService = Depends(get_pairing_service),
 ):
     """
-    Get all pairing records.
+    Get pairing records, newest first, one page at a time.
+    Pass the X-Next-Cursor response header as start_after to fetch the next page.
+    API key callers can list records of their whole client with scope=client.
     """
     try:
-        return pairing_service.get_pairing_records(auth)
+        records, next_cursor = await pairing_service.get_pairing_records(
+            auth, limit=limit, start_after=start_after, scope=scope
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return records
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": str(e)}
     
+@router.get("/pairs/export")
+async def export_pairing_records(
+    gzip: bool = Query(False),
+    scope: str = Query("key", pattern="^(key|client)$"),
+    auth: dict = Depends(get_auth),
+    pairing_service: PairingService = Depends(get_pairing_service),
+):
+    """
+    Stream all pairing records as newline-delimited JSON, optionally gzip-encoded.
+    """
+    records = await pairing_service.export_pairing_records(auth, scope=scope, compress=gzip)
+    headers = {"Content-Disposition": 'attachment; filename="pairings.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        records,
+        media_type="application/x-ndjson",
+        headers=headers
+    )
+    
 # Integration with External API
-ENCRYPT_API_URL = "https://furina-encryption-service.codebloop.my.id/api/encrypt"
-DECRYPT_API_URL = "https://furina-encryption-service.codebloop.my.id/api/decrypt"
-
-# Convert Image to Base64
-def image_to_base64(file: UploadFile):
-    return base64.b64encode(file.file.read()).decode("utf-8")
-
 @router.post("/encryptions")
 async def encrypt_image_api(
     image: UploadFile, 
     sensitivity: str = Form("medium"),
     auth: dict = Depends(get_auth),
+    encryption_service: EncryptionService = Depends(get_encryption_service),
 ):
     """
     Encrypt an image with post-quantum safe encryption.
     """
     try:
-        settings = get_settings()
-        FURINA_API_KEY = settings.FURINA_API_KEY
-
         # Convert image to Base64
-        image_base64 = image_to_base64(image)
+        image_base64 = await image_to_base64(image)
 
         # Call external encryption API
-        payload = {
-            "text": image_base64,
-            "sensitivity": sensitivity
-        }
-        headers = {
-            "accept": "application/json",
-            "furina-encryption-service": FURINA_API_KEY,
-            "Content-Type": "application/json"
-        }
-        response = requests.post(ENCRYPT_API_URL, headers=headers, data=json.dumps(payload))
+        response = await encryption_service.encrypt(image_base64, sensitivity)
 
         if response.status_code != 200:
             return {"error": "Failed to encrypt the image", "details": response.text}
@@ -178,26 +235,14 @@ async def encrypt_image_api(
 async def decrypt_image_api(
     body: DecryptionsBody,
     auth: dict = Depends(get_auth),
+    encryption_service: EncryptionService = Depends(get_encryption_service),
 ):
     """
     Decrypt an image encrypted with post-quantum safe encryption.
     """
     try:
-        settings = get_settings()
-        FURINA_API_KEY = settings.FURINA_API_KEY
-
         # Call external decryption API
-        payload = {
-            "key_id": body.key_id,
-            "cipher_text": body.cipher_text,
-            "iv": body.iv
-        }
-        headers = {
-            "accept": "application/json",
-            "Content-Type": "application/json",
-            "furina-encryption-service": FURINA_API_KEY
-        }
-        response = requests.post(DECRYPT_API_URL, headers=headers, data=json.dumps(payload))
+        response = await encryption_service.decrypt(body.key_id, body.cipher_text, body.iv)
 
         if response.status_code != 200:
             return {"error": "Failed to decrypt the image", "details": response.text}
@@ -207,12 +252,20 @@ async def decrypt_image_api(
         if not decrypted_data:
             return {"error": "No decrypted data found"}
 
-        # Save decrypted Base64 as image
-        output_path = "decrypted_image.jpg"
-        with open(output_path, "wb") as img_file:
-            img_file.write(base64.b64decode(decrypted_data))
+        # Validate the whole text up front so malformed data fails before streaming starts
+        if WHITESPACE.search(decrypted_data):
+            decrypted_data = WHITESPACE.sub("", decrypted_data)
+        if not is_valid_base64(decrypted_data):
+            return {"error": "Decrypted data is not valid Base64"}
 
-        # Return the image as a downloadable file
-        return FileResponse(output_path, media_type="image/jpeg", filename="decrypted_image.jpg")
+        # Stream the image from memory as a downloadable file
+        return StreamingResponse(
+            base64_to_chunks(decrypted_data),
+            media_type="image/jpeg",
+            headers={
+                "Content-Disposition": 'attachment; filename="decrypted_image.jpg"',
+                "Content-Length": str(decoded_base64_length(decrypted_data))
+            }
+        )
     except Exception as e:
         return {"error": str(e)}
\ No newline at end of file
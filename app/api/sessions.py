@@ -1,8 +1,8 @@
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, status
 from firebase_admin import auth
 from app.core.security import get_current_user
 from app.core.config import settings
+from app.core.http_client import get_http_client_manager
 from pydantic import BaseModel, EmailStr
 
 class SessionBody(BaseModel):
@@ -20,8 +20,8 @@ async def login(user: SessionBody):
         "returnSecureToken": True
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload)
+    client = get_http_client_manager().client
+    response = await client.post(url, json=payload)
 
     if response.status_code != 200:
         raise HTTPException(
@@ -0,0 +1,61 @@
+from typing import Iterator
+import base64
+import re
+from fastapi import UploadFile
+
+# Base64 chunk sizes: multiples of 3 raw bytes and 4 encoded characters keep
+# every chunk free of padding, so encoded or decoded chunks can be concatenated
+BASE64_RAW_CHUNK = 48 * 1024
+BASE64_TEXT_CHUNK = BASE64_RAW_CHUNK // 3 * 4
+WHITESPACE = re.compile(r"\s+")
+BASE64_TEXT = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+
+def encoded_base64_length(size: int) -> int:
+    """Length of the padded Base64 text encoding size bytes."""
+    return (size + 2) // 3 * 4
+
+def decoded_base64_length(text: str) -> int:
+    """Length in bytes of the data encoded by padded Base64 text."""
+    if len(text) % 4:
+        raise ValueError("Base64 text length must be a multiple of 4")
+    return len(text) // 4 * 3 - (len(text) - len(text.rstrip("=")))
+
+def is_valid_base64(text: str) -> bool:
+    """Whether text is padded Base64 that decodes without error, checked over the whole string."""
+    return len(text) % 4 == 0 and BASE64_TEXT.fullmatch(text) is not None
+
+async def image_to_base64(file: UploadFile) -> bytearray:
+    """
+    Base64-encode an upload chunk by chunk into one buffer of the final encoded
+    size, returned as ASCII bytes.
+    """
+    if file.size is None:
+        return bytearray(base64.b64encode(await file.read()))
+
+    encoded = bytearray(encoded_base64_length(file.size))
+    position = 0
+    pending = b""
+    while True:
+        chunk = await file.read(BASE64_RAW_CHUNK)
+        final = not chunk
+        if pending:
+            chunk = pending + chunk
+        # Hold back a partial 3-byte group until the end so padding only appears last
+        usable = len(chunk) if final else len(chunk) - len(chunk) % 3
+        pending = chunk[usable:]
+        piece = base64.b64encode(chunk[:usable])
+        if position + len(piece) > len(encoded):
+            raise ValueError(f"Upload is larger than its declared size of {file.size} bytes")
+        encoded[position:position + len(piece)] = piece
+        position += len(piece)
+        if final:
+            break
+
+    if position != len(encoded):
+        raise ValueError(f"Upload is smaller than its declared size of {file.size} bytes")
+    return encoded
+
+def base64_to_chunks(text: str) -> Iterator[bytes]:
+    """Decode Base64 text lazily, one chunk at a time."""
+    for start in range(0, len(text), BASE64_TEXT_CHUNK):
+        yield base64.b64decode(text[start:start + BASE64_TEXT_CHUNK], validate=True)
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+import sys
+import threading
+import time
+from app.core.metrics import CACHE_REQUESTS
+
+def approximate_size(value: Any) -> int:
+    """
+    Approximate the in-memory size of plain Python data in bytes.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item) for item in value)
+    return size
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry expiry, an optional memory bound
+    and hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = approximate_size,
+        name: Optional[str] = None
+    ):
+        """
+        Create a cache holding at most max_entries values for ttl seconds.
+        A max_entries of 0 disables the cache. Named caches export hit/miss metrics.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.max_entries > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for key, or default if missing or expired.
+        """
+        _, value = self.get_first([key], default)
+        return value
+
+    def get_first(self, keys: Sequence[Hashable], default: Any = None) -> Tuple[Optional[Hashable], Any]:
+        """
+        Return the first of keys holding a live value, with that value, counted as
+        a single lookup. Returns (None, default) if none of them do.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, _, value = entry
+                if expires_at <= now:
+                    self._remove(key)
+                    continue
+                self._entries.move_to_end(key)
+                self._record(hit=True)
+                return key, value
+            self._record(hit=False)
+            return None, default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store value under key, evicting least recently used entries as needed.
+        """
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove key from the cache and return its value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry[2]
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _record(self, hit: bool) -> None:
+        """Count a lookup; the caller must hold the lock."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self.name:
+            CACHE_REQUESTS.labels(cache=self.name, result="hit" if hit else "miss").inc()
+
+    def _remove(self, key: Hashable) -> None:
+        """Drop an entry; the caller must hold the lock."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
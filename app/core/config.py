@@ -20,6 +20,16 @@ class Settings(BaseSettings):
     )
     FIREBASE_API_KEY: str = os.getenv("FIREBASE_API_KEY")
 
+    # Verified ID token cache settings
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    TOKEN_CACHE_EXPIRY_MARGIN_SECONDS: int = int(os.getenv("TOKEN_CACHE_EXPIRY_MARGIN_SECONDS", "60"))
+
+    # API key validation cache settings
+    API_KEY_CACHE_MAX_ENTRIES: int = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+    API_KEY_CACHE_TTL_SECONDS: int = int(os.getenv("API_KEY_CACHE_TTL_SECONDS", "60"))
+    API_KEY_NEGATIVE_CACHE_TTL_SECONDS: int = int(os.getenv("API_KEY_NEGATIVE_CACHE_TTL_SECONDS", "10"))
+    API_KEY_REVOCATION_LISTENER: bool = os.getenv("API_KEY_REVOCATION_LISTENER", "false").lower() == "true"
+
     # Google Cloud Storage settings
     STORAGE_BUCKET: str = os.getenv("STORAGE_BUCKET")
     GOOGLE_CLOUD_PROJECT: str = os.getenv("GOOGLE_CLOUD_PROJECT")
@@ -31,13 +41,90 @@ class Settings(BaseSettings):
     )
     VISION_AI_LOCATION: str = os.getenv("VISION_AI_LOCATION", "us-central1")
     MAX_RESULTS: int = int(os.getenv("VISION_MAX_RESULTS", "3"))
+    VISION_MAX_CONCURRENCY: int = int(os.getenv("VISION_MAX_CONCURRENCY", "16"))
+
+    # Image preprocessing before Vision AI; STORAGE_IMAGE_VARIANT is "original" or "compact"
+    IMAGE_PREPROCESS_ENABLED: bool = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+    IMAGE_MAX_EDGE: int = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+    IMAGE_COMPACT_FORMAT: str = os.getenv("IMAGE_COMPACT_FORMAT", "JPEG")
+    IMAGE_COMPACT_QUALITY: int = int(os.getenv("IMAGE_COMPACT_QUALITY", "85"))
+    STORAGE_IMAGE_VARIANT: str = os.getenv("STORAGE_IMAGE_VARIANT", "original")
+
+    # Uploaded image ingestion
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+    # Dominant color backend: "vision" (IMAGE_PROPERTIES) or "local" (NumPy k-means)
+    COLOR_BACKEND: str = os.getenv("COLOR_BACKEND", "vision")
+    LOCAL_COLOR_COUNT: int = int(os.getenv("LOCAL_COLOR_COUNT", "10"))
+    LOCAL_COLOR_SAMPLE_EDGE: int = int(os.getenv("LOCAL_COLOR_SAMPLE_EDGE", "64"))
+    IMAGE_DOWNLOAD_MAX_BYTES: int = int(os.getenv("IMAGE_DOWNLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+
+    # Color matching: "keyword" (RGB rules) or "perceptual" (CIELAB delta E)
+    COLOR_MATCH_MODE: str = os.getenv("COLOR_MATCH_MODE", "keyword")
+
+    # Vision analysis cache settings (set max entries to 0 to disable)
+    VISION_CACHE_MAX_ENTRIES: int = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "1024"))
+    VISION_CACHE_TTL_SECONDS: int = int(os.getenv("VISION_CACHE_TTL_SECONDS", "3600"))
+    VISION_CACHE_MAX_BYTES: int = int(os.getenv("VISION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Search result (URI) analysis cache settings, optionally persisted to Firestore
+    VISION_URI_CACHE_MAX_ENTRIES: int = int(os.getenv("VISION_URI_CACHE_MAX_ENTRIES", "4096"))
+    VISION_URI_CACHE_TTL_SECONDS: int = int(os.getenv("VISION_URI_CACHE_TTL_SECONDS", "86400"))
+    VISION_URI_CACHE_MAX_BYTES: int = int(os.getenv("VISION_URI_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    VISION_URI_CACHE_FIRESTORE: bool = os.getenv("VISION_URI_CACHE_FIRESTORE", "false").lower() == "true"
 
     # Custom Search settings
     CUSTOM_SEARCH_API_KEY: str = os.getenv("CUSTOM_SEARCH_API_KEY")
     CUSTOM_SEARCH_CX: str = os.getenv("CUSTOM_SEARCH_CX") 
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "4096"))
+    SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+    SEARCH_NEGATIVE_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_NEGATIVE_CACHE_TTL_SECONDS", "600"))
+    # "sequential" or "concurrent" fallback query strategy
+    SEARCH_FALLBACK_MODE: str = os.getenv("SEARCH_FALLBACK_MODE", "sequential")
+    SEARCH_FALLBACK_CONCURRENCY: int = int(os.getenv("SEARCH_FALLBACK_CONCURRENCY", "4"))
+    SEARCH_CANDIDATE_CONCURRENCY: int = int(os.getenv("SEARCH_CANDIDATE_CONCURRENCY", "4"))
+
+    # Pairing history pagination
+    PAIRING_PAGE_SIZE: int = int(os.getenv("PAIRING_PAGE_SIZE", "50"))
+    PAIRING_MAX_PAGE_SIZE: int = int(os.getenv("PAIRING_MAX_PAGE_SIZE", "500"))
+
+    # Write-behind pairing record writer
+    PAIRING_WRITE_BEHIND: bool = os.getenv("PAIRING_WRITE_BEHIND", "false").lower() == "true"
+    PAIRING_WRITE_QUEUE_SIZE: int = int(os.getenv("PAIRING_WRITE_QUEUE_SIZE", "10000"))
+    PAIRING_WRITE_BATCH_SIZE: int = int(os.getenv("PAIRING_WRITE_BATCH_SIZE", "500"))
+    PAIRING_WRITE_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("PAIRING_WRITE_FLUSH_INTERVAL_SECONDS", "1"))
+    PAIRING_WRITE_ENQUEUE_TIMEOUT_SECONDS: float = float(os.getenv("PAIRING_WRITE_ENQUEUE_TIMEOUT_SECONDS", "1"))
+    PAIRING_WRITE_MAX_RETRIES: int = int(os.getenv("PAIRING_WRITE_MAX_RETRIES", "3"))
+    PAIRING_WRITE_RETRY_BACKOFF_SECONDS: float = float(os.getenv("PAIRING_WRITE_RETRY_BACKOFF_SECONDS", "0.5"))
+
+    # Batch pairing endpoint
+    PAIRING_BATCH_MAX_IMAGES: int = int(os.getenv("PAIRING_BATCH_MAX_IMAGES", "64"))
+    PAIRING_BATCH_CONCURRENCY: int = int(os.getenv("PAIRING_BATCH_CONCURRENCY", "8"))
+
+    # Asynchronous pairing jobs
+    PAIRING_JOB_WORKERS: int = int(os.getenv("PAIRING_JOB_WORKERS", "4"))
+    PAIRING_JOB_QUEUE_SIZE: int = int(os.getenv("PAIRING_JOB_QUEUE_SIZE", "100"))
+    PAIRING_JOB_RESULT_TTL_SECONDS: int = int(os.getenv("PAIRING_JOB_RESULT_TTL_SECONDS", "3600"))
+    PAIRING_JOB_MAX_RUN_SECONDS: int = int(os.getenv("PAIRING_JOB_MAX_RUN_SECONDS", "300"))
+    PAIRING_JOB_MAX_WAIT_SECONDS: int = int(os.getenv("PAIRING_JOB_MAX_WAIT_SECONDS", "30"))
+
+    # Outbound HTTP client pool settings
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    HTTP_READ_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "15"))
+    HTTP_ENABLE_HTTP2: bool = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
 
     # Peers API Integration settings
     FURINA_API_KEY: str = os.getenv("FURINA_API_KEY")
+    FURINA_API_URL: str = os.getenv("FURINA_API_URL", "https://furina-encryption-service.codebloop.my.id/api")
+    FURINA_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("FURINA_CONNECT_TIMEOUT_SECONDS", "5"))
+    FURINA_READ_TIMEOUT_SECONDS: float = float(os.getenv("FURINA_READ_TIMEOUT_SECONDS", "30"))
+    FURINA_MAX_RETRIES: int = int(os.getenv("FURINA_MAX_RETRIES", "2"))
+    FURINA_RETRY_BACKOFF_SECONDS: float = float(os.getenv("FURINA_RETRY_BACKOFF_SECONDS", "0.5"))
+    FURINA_MAX_CONCURRENCY: int = int(os.getenv("FURINA_MAX_CONCURRENCY", "16"))
     
     class Config:
         case_sensitive = True
@@ -1,20 +1,33 @@
 import firebase_admin
-from firebase_admin import credentials, auth, firestore, storage
+from firebase_admin import credentials, auth, firestore, firestore_async, storage
 from typing import Optional
 from functools import lru_cache
+import hashlib
+import time
+from app.core.cache import TTLCache
+from app.core.config import get_settings
 
 class FirebaseManager:
     """
     Manages Firebase services including Auth, Firestore, and Storage.
     """
     
-    def __init__(self, credentials_path: str):
+    def __init__(
+        self,
+        credentials_path: str,
+        token_cache_max_entries: int = 10000,
+        token_expiry_margin: int = 60
+    ):
         """
         Initialize Firebase manager with credentials.
         """
         self.credentials_path = credentials_path
         self._db: Optional[firestore.Client] = None
+        self._async_db: Optional[firestore.AsyncClient] = None
         self._bucket: Optional[storage.bucket] = None
+        # Decoded ID token claims keyed by token digest, held until shortly before expiry
+        self.token_expiry_margin = token_expiry_margin
+        self._token_cache = TTLCache(max_entries=token_cache_max_entries, ttl=3600, name="id_token")
         self._initialize_app()
     
     def _initialize_app(self) -> None:
@@ -48,6 +61,15 @@ class FirebaseManager:
             raise RuntimeError("Firestore client is not initialized.")
         return self._db
     
+    @property
+    def async_db(self) -> firestore.AsyncClient:
+        """Get async Firestore client for request-path reads and writes."""
+        if not self._async_db:
+            if not firebase_admin._apps:
+                self._initialize_app()
+            self._async_db = firestore_async.client()
+        return self._async_db
+
     @property
     def storage(self) -> storage.bucket:
         """Get Firebase Storage bucket."""
@@ -59,13 +81,24 @@ class FirebaseManager:
     
     def verify_token(self, token: str) -> dict:
         """
-        Verify Firebase ID token.
+        Verify Firebase ID token, reusing cached claims until the token expires.
+        Revocation is not checked, so an ID token stays valid until it expires
+        even after logout revokes the user's refresh tokens.
         """
         try:
-            return auth.verify_id_token(token)
+            key = hashlib.sha256(token.encode('utf-8')).hexdigest() if isinstance(token, str) else None
+            cached = self._token_cache.get(key) if key else None
+            if cached is not None:
+                return cached
+
+            claims = auth.verify_id_token(token)
         except Exception as e:
             raise ValueError(f"Token verification failed: {str(e)}")
-    
+
+        ttl = claims.get('exp', 0) - time.time() - self.token_expiry_margin
+        self._token_cache.set(key, claims, ttl=ttl)
+        return claims
+
     def check_api_key_exists(self, api_key_id: str) -> bool:
         """
         Check if an API key document exists.
@@ -78,4 +111,9 @@ def get_firebase_manager(credentials_path: str) -> FirebaseManager:
     """
     Get or create a cached FirebaseManager instance.
     """
-    return FirebaseManager(credentials_path)
\ No newline at end of file
+    settings = get_settings()
+    return FirebaseManager(
+        credentials_path,
+        token_cache_max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+        token_expiry_margin=settings.TOKEN_CACHE_EXPIRY_MARGIN_SECONDS
+    )
\ No newline at end of file
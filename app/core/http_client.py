@@ -0,0 +1,94 @@
+import httpx
+from typing import Optional
+from functools import lru_cache
+import asyncio
+import importlib.util
+import ipaddress
+import socket
+from app.core.config import get_settings
+
+class HTTPClientManager:
+    """
+    Manages the application-wide pooled HTTP client for outbound calls.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        http2: bool = True
+    ):
+        """
+        Initialize HTTP client manager with pool limits and timeouts.
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        # HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        """Create the pooled client."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2
+            )
+
+    async def close(self) -> None:
+        """Close the pooled client and its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client."""
+        if self._client is None or self._client.is_closed:
+            raise RuntimeError("HTTP client is not initialized.")
+        return self._client
+
+async def ensure_public_url(url: str) -> httpx.URL:
+    """
+    Check that a third-party URL is http(s) and that its host resolves only to
+    public addresses, so fetching it cannot reach loopback, private, link-local
+    or metadata endpoints. Raises ValueError otherwise.
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        raise ValueError("only http and https URLs can be fetched")
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(
+            parsed.host, port, type=socket.SOCK_STREAM
+        )
+    except socket.gaierror:
+        raise ValueError("host could not be resolved")
+    for address in addresses:
+        ip = ipaddress.ip_address(address[4][0].split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError("host resolves to a non-public address")
+    return parsed
+
+@lru_cache()
+def get_http_client_manager() -> HTTPClientManager:
+    """
+    Get or create a cached HTTPClientManager instance.
+    """
+    settings = get_settings()
+    return HTTPClientManager(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=settings.HTTP_READ_TIMEOUT_SECONDS,
+        http2=settings.HTTP_ENABLE_HTTP2
+    )
@@ -0,0 +1,122 @@
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+import os
+import tempfile
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+# shared by all workers before start; each worker then writes its samples there and
+# /metrics aggregates them.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "pairfect_http_request_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pairfect_pipeline_stage_seconds",
+    "Duration of image pairing pipeline stages.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "pairfect_upstream_request_seconds",
+    "Latency of calls to upstream services.",
+    ["upstream", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_ERRORS = Counter(
+    "pairfect_upstream_errors_total",
+    "Failed calls to upstream services.",
+    ["upstream", "operation"]
+)
+CACHE_REQUESTS = Counter(
+    "pairfect_cache_requests_total",
+    "In-memory cache lookups by result.",
+    ["cache", "result"]
+)
+SEARCH_FALLBACKS = Counter(
+    "pairfect_search_fallbacks_total",
+    "Image searches that fell back to shorter search terms."
+)
+SEARCH_FALLBACK_QUERIES = Counter(
+    "pairfect_search_fallback_queries_total",
+    "Fallback search terms tried."
+)
+PAIRING_WRITE_QUEUE_DEPTH = Gauge(
+    "pairfect_pairing_write_queue_depth",
+    "Pairing records waiting in the write-behind queue.",
+    multiprocess_mode="livesum"
+)
+PAIRING_WRITE_FLUSH_SECONDS = Histogram(
+    "pairfect_pairing_write_flush_seconds",
+    "Duration of write-behind batch flushes.",
+    buckets=LATENCY_BUCKETS
+)
+PAIRING_WRITE_FAILURES = Counter(
+    "pairfect_pairing_write_failures_total",
+    "Acknowledged pairing records that could not be written."
+)
+PAIRING_JOB_QUEUE_DEPTH = Gauge(
+    "pairfect_pairing_job_queue_depth",
+    "Pairing jobs waiting for a worker.",
+    multiprocess_mode="livesum"
+)
+
+@contextmanager
+def track_upstream(upstream: str, operation: str) -> Iterator[None]:
+    """Time a call to an upstream service, counting it as an error if it raises."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(upstream=upstream, operation=operation).inc()
+        raise
+    finally:
+        UPSTREAM_REQUEST_SECONDS.labels(upstream=upstream, operation=operation).observe(
+            time.perf_counter() - start_time
+        )
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return every metric in Prometheus text format, with its content type."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def prepare_multiprocess_dir() -> str:
+    """
+    Point PROMETHEUS_MULTIPROC_DIR at an empty directory before worker processes
+    start: clear stale metric files from the configured one, or create a temporary one.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        path = tempfile.mkdtemp(prefix="pairfect-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+        return path
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    return path
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the multiprocess directory on shutdown."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
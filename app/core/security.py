@@ -1,19 +1,80 @@
 from fastapi import Depends, HTTPException, status, Security
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from firebase_admin import auth
+from app.core.cache import TTLCache
 from app.core.firebase import get_firebase_manager
 from app.core.config import get_settings
+from datetime import datetime, timezone
 from typing import Optional
 
 settings = get_settings()
 firebase_manager = get_firebase_manager(settings.FIREBASE_CREDENTIALS_PATH)
 
+# Validated API key records, plus short-lived negative entries for unknown keys
+_api_key_cache = TTLCache(
+    max_entries=settings.API_KEY_CACHE_MAX_ENTRIES,
+    ttl=settings.API_KEY_CACHE_TTL_SECONDS,
+    name="api_key"
+)
+_UNKNOWN_API_KEY = object()
+_api_key_watch = None
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/session", auto_error=False)
 api_key_header = APIKeyHeader(name="x-api-key", auto_error=False)
 
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="api/v1/session", auto_error=False)
 api_key_header_optional = APIKeyHeader(name="x-api-key", auto_error=False)
 
+async def lookup_api_key(api_key: str) -> Optional[dict]:
+    """
+    Get an API key record from the cache or Firestore, or None if it does not exist.
+    """
+    cached = _api_key_cache.get(api_key)
+    if cached is _UNKNOWN_API_KEY:
+        return None
+    if cached is not None:
+        return cached
+
+    doc = await firebase_manager.async_db.collection('api_keys').document(api_key).get()
+    if not doc.exists:
+        _api_key_cache.set(api_key, _UNKNOWN_API_KEY, ttl=settings.API_KEY_NEGATIVE_CACHE_TTL_SECONDS)
+        return None
+    key_data = doc.to_dict()
+    _api_key_cache.set(api_key, key_data)
+    return key_data
+
+def invalidate_api_key(api_key: str) -> None:
+    """
+    Drop a cached API key record so the next request re-reads Firestore.
+    """
+    _api_key_cache.pop(api_key)
+
+def start_api_key_revocation_listener() -> None:
+    """
+    Listen for API key revocations in Firestore and evict them from this worker's cache.
+    """
+    global _api_key_watch
+    if _api_key_watch is not None:
+        return
+
+    def on_snapshot(docs, changes, read_time):
+        for change in changes:
+            invalidate_api_key(change.document.id)
+
+    query = firebase_manager.db.collection('api_keys').where(
+        'revoked_at', '>=', datetime.now(timezone.utc)
+    )
+    _api_key_watch = query.on_snapshot(on_snapshot)
+
+def stop_api_key_revocation_listener() -> None:
+    """
+    Stop the API key revocation listener.
+    """
+    global _api_key_watch
+    if _api_key_watch is not None:
+        _api_key_watch.unsubscribe()
+        _api_key_watch = None
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Verify Firebase ID token and return user data.
@@ -37,19 +98,20 @@ async def get_api_key(api_key: str = Security(api_key_header)):
             detail="API Key header not found"
         )
     try:
-        doc = firebase_manager.db.collection('api_keys').document(api_key).get()
-        if not doc.exists:
+        key_data = await lookup_api_key(api_key)
+        if key_data is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid API Key"
             )
-        key_data = doc.to_dict()
         if not key_data.get("is_active"):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="API Key is inactive"
             )
         return key_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -81,16 +143,17 @@ async def get_optional_api_key(api_key: Optional[str] = Security(api_key_header)
     if not api_key:
         return None
     try:
-        doc = firebase_manager.db.collection('api_keys').document(api_key).get()
-        if not doc.exists:
+        key_data = await lookup_api_key(api_key)
+        if key_data is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API Key")
-        key_data = doc.to_dict()
         if not key_data.get("is_active"):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="API Key is inactive")
         return {
             "api_key_id": api_key,
             "client_id": key_data.get("client_id") 
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error validating API Key: {e}")
 
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+import hashlib
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Leading bytes of the image formats Vision AI accepts
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", 'image/jpeg'),
+    (b"\x89PNG\r\n\x1a\n", 'image/png'),
+    (b"GIF87a", 'image/gif'),
+    (b"GIF89a", 'image/gif'),
+    (b"BM", 'image/bmp'),
+    (b"II*\x00", 'image/tiff'),
+    (b"MM\x00*", 'image/tiff'),
+    (b"\x00\x00\x01\x00", 'image/x-icon'),
+]
+SNIFF_BYTES = 16
+# Allowance for multipart boundaries, part headers and form fields around an image
+MULTIPART_OVERHEAD = 64 * 1024
+
+@dataclass
+class ImageUpload:
+    """An uploaded image read into a single buffer, with its sniffed type and SHA-256."""
+    content: bytes
+    content_type: str
+    digest: str
+    size: int
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """
+    Identify an image format from its first bytes, or return None.
+    """
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return 'image/webp'
+    for signature, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    return None
+
+async def read_image_upload(
+    upload: UploadFile,
+    max_bytes: int,
+    chunk_size: int = 64 * 1024
+) -> ImageUpload:
+    """
+    Read an uploaded image in chunks, hashing as it goes. Raises 413 as soon as
+    the upload exceeds max_bytes and 400 when its bytes are not a known image format.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image exceeds the maximum upload size of {max_bytes} bytes"
+    )
+    if upload.size is not None and upload.size > max_bytes:
+        raise too_large
+
+    hasher = hashlib.sha256()
+    chunks = []
+    size = 0
+    header = b""
+    content_type = None
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+        hasher.update(chunk)
+        if len(header) < SNIFF_BYTES:
+            header += chunk[:SNIFF_BYTES - len(header)]
+            if len(header) == SNIFF_BYTES:
+                content_type = sniff_image_type(header)
+                if content_type is None:
+                    break
+
+    content_type = content_type or sniff_image_type(header)
+    if content_type is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be an image")
+
+    # Join the chunks once; a single chunk is returned as is
+    return ImageUpload(
+        content=b"".join(chunks),
+        content_type=content_type,
+        digest=hasher.hexdigest(),
+        size=size
+    )
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject uploads whose declared Content-Length exceeds the limit for their path
+    with 413, before any of the body is read or parsed as a form.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        """Wrap app; limits maps request paths to their maximum body size in bytes."""
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Answer 413 for an oversized declared body, otherwise pass the request on."""
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is not None:
+            headers = dict(scope.get("headers") or [])
+            content_length = headers.get(b"content-length", b"")
+            if content_length.isdigit() and int(content_length) > limit:
+                response = JSONResponse(
+                    {"detail": f"Request body exceeds the maximum upload size of {limit} bytes"},
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -1,13 +1,30 @@
 from google.cloud import vision
-from typing import List, Optional
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Union
+from functools import lru_cache, partial
+import asyncio
 import os
+from app.core.metrics import track_upstream
 
 class VisionAIManager:
-    def __init__(self, credentials_path: str, location: str = "us-central1"):
+    MAX_BATCH_SIZE = 16  # Vision AI limit for images per batch_annotate_images request
+
+    def __init__(
+        self,
+        credentials_path: str,
+        location: str = "us-central1",
+        max_concurrency: int = 16
+    ):
         self.credentials_path = credentials_path
         self.location = location
+        self.max_concurrency = max_concurrency
         self._client: Optional[vision.ImageAnnotatorClient] = None
+        # The Vision client is synchronous, so calls run on a bounded pool
+        # to keep the event loop free while gRPC requests are in flight.
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="vision"
+        )
         self._initialize_client()
     
     def _initialize_client(self) -> None:
@@ -25,12 +42,110 @@ class VisionAIManager:
         if not self._client:
             raise RuntimeError("Vision AI client is not initialized.")
         return self._client
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking Vision AI call on the bounded executor."""
+        loop = asyncio.get_running_loop()
+        with track_upstream("vision", getattr(func, "__name__", "call")):
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def close(self) -> None:
+        """Shut down the Vision AI executor."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
     
+    def _build_features(self, include_faces: bool, include_colors: bool = True) -> List[vision.Feature]:
+        """Build the feature list for a combined annotate request."""
+        features = [vision.Feature(type_=vision.Feature.Type.LABEL_DETECTION)]
+        if include_colors:
+            features.append(vision.Feature(type_=vision.Feature.Type.IMAGE_PROPERTIES))
+        if include_faces:
+            features.append(vision.Feature(type_=vision.Feature.Type.FACE_DETECTION))
+        return features
+
+    async def annotate_image(
+        self,
+        image_content: bytes,
+        include_faces: bool = False,
+        include_colors: bool = True
+    ) -> vision.AnnotateImageResponse:
+        """Detect labels and optionally image properties and faces in a single request."""
+        try:
+            image = vision.Image(content=image_content)
+            response = await self._run(self.client.annotate_image, {
+                'image': image,
+                'features': self._build_features(include_faces, include_colors)
+            })
+
+            if response.error.message:
+                raise Exception(f"Image annotation failed: {response.error.message}")
+
+            return response
+
+        except Exception as e:
+            raise RuntimeError(f"Image annotation failed: {e}")
+
+    async def annotate_image_from_uri(
+        self,
+        image_uri: str,
+        include_faces: bool = False,
+        include_colors: bool = True
+    ) -> vision.AnnotateImageResponse:
+        """Detect labels and optionally image properties and faces from a URI in a single request."""
+        try:
+            image = vision.Image()
+            image.source.image_uri = image_uri
+            response = await self._run(self.client.annotate_image, {
+                'image': image,
+                'features': self._build_features(include_faces, include_colors)
+            })
+
+            if response.error.message:
+                raise Exception(f"Image annotation failed: {response.error.message}")
+
+            return response
+
+        except Exception as e:
+            raise RuntimeError(f"Image annotation failed: {e}")
+
+    async def batch_annotate_images(
+        self,
+        images_content: List[bytes],
+        include_faces: bool = False,
+        include_colors: bool = True
+    ) -> List[Union[vision.AnnotateImageResponse, Exception]]:
+        """
+        Annotate many images, sending up to MAX_BATCH_SIZE per request and running the
+        requests concurrently. A request that fails yields its error for each of its
+        images only, so the result has one response or exception per image.
+        """
+        features = self._build_features(include_faces, include_colors)
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=content), features=features)
+            for content in images_content
+        ]
+        groups = [
+            requests[i:i + self.MAX_BATCH_SIZE]
+            for i in range(0, len(requests), self.MAX_BATCH_SIZE)
+        ]
+        batches = await asyncio.gather(
+            *(self._run(self.client.batch_annotate_images, requests=group) for group in groups),
+            return_exceptions=True
+        )
+
+        responses: List[Union[vision.AnnotateImageResponse, Exception]] = []
+        for group, batch in zip(groups, batches):
+            if isinstance(batch, Exception):
+                error = RuntimeError(f"Batch image annotation failed: {batch}")
+                responses.extend(error for _ in group)
+            else:
+                responses.extend(batch.responses)
+        return responses
+
     async def detect_labels(self, image_content: bytes) -> List[vision.EntityAnnotation]:
         """Detect labels in an image"""
         try:
             image = vision.Image(content=image_content)
-            response = self.client.label_detection(image=image)
+            response = await self._run(self.client.label_detection, image=image)
             
             if response.error.message:
                 raise Exception(
@@ -46,7 +161,7 @@ class VisionAIManager:
         """Detect image properties, including dominant colors."""
         try:
             image = vision.Image(content=image_content)
-            response = self.client.image_properties(image=image)
+            response = await self._run(self.client.image_properties, image=image)
 
             if response.error.message:
                 raise Exception(f"Vision AI image properties detection failed: {response.error.message}")
@@ -60,7 +175,7 @@ class VisionAIManager:
         """Detect faces in an image."""
         try:
             image = vision.Image(content=image_content)
-            response = self.client.face_detection(image=image)
+            response = await self._run(self.client.face_detection, image=image)
             
             if response.error.message:
                 raise Exception(f"Face detection failed: {response.error.message}")
@@ -75,7 +190,7 @@ class VisionAIManager:
         try:
             image = vision.Image()
             image.source.image_uri = image_uri
-            response = self.client.label_detection(image=image)
+            response = await self._run(self.client.label_detection, image=image)
             
             if response.error.message:
                 raise Exception(f"Error detecting labels: {response.error.message}")
@@ -90,7 +205,7 @@ class VisionAIManager:
         try:
             image = vision.Image()
             image.source.image_uri = image_uri
-            response = self.client.image_properties(image=image)
+            response = await self._run(self.client.image_properties, image=image)
             
             if response.error.message:
                 raise Exception(f"Image properties detection failed: {response.error.message}")
@@ -105,7 +220,7 @@ class VisionAIManager:
         try:
             image = vision.Image()
             image.source.image_uri = image_uri
-            response = self.client.face_detection(image=image)
+            response = await self._run(self.client.face_detection, image=image)
             
             if response.error.message:
                 raise Exception(f"Face detection failed: {response.error.message}")
@@ -118,7 +233,8 @@ class VisionAIManager:
 @lru_cache()
 def get_vision_manager(
     credentials_path: str,
-    location: str = "us-central1"
+    location: str = "us-central1",
+    max_concurrency: int = 16
 ) -> VisionAIManager:
     """Get or create a cached VisionAIManager instance."""
-    return VisionAIManager(credentials_path, location)
\ No newline at end of file
+    return VisionAIManager(credentials_path, location, max_concurrency)
\ No newline at end of file
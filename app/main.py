@@ -1,8 +1,14 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
 from app.core.firebase import get_firebase_manager
+from app.core.http_client import get_http_client_manager
+from app.core.metrics import HTTP_REQUEST_SECONDS, mark_process_dead, prepare_multiprocess_dir, render_metrics
+from app.core.security import start_api_key_revocation_listener, stop_api_key_revocation_listener
+from app.core.uploads import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
 from app.core.vision import get_vision_manager
+from app.services.pairing_jobs import get_pairing_job_manager
+from app.services.pairing_writer import get_pairing_writer
 from app.api import api_keys, sessions, users, images
 import time
 from typing import Dict
@@ -18,6 +24,17 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Reject oversized uploads from their Content-Length before the form is parsed
+upload_limit = settings.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        f"{settings.API_V1_STR}/images/pairs": upload_limit,
+        f"{settings.API_V1_STR}/images/pairs/jobs": upload_limit,
+        f"{settings.API_V1_STR}/images/pairs/batch": upload_limit * settings.PAIRING_BATCH_MAX_IMAGES,
+    }
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize Firebase during startup
@@ -35,10 +53,37 @@ async def startup_event():
     """
     try:
         get_firebase_manager(settings.FIREBASE_CREDENTIALS_PATH)
-        get_vision_manager(settings.VISION_CREDENTIALS_PATH)
+        get_vision_manager(
+            credentials_path=settings.VISION_CREDENTIALS_PATH,
+            location=settings.VISION_AI_LOCATION,
+            max_concurrency=settings.VISION_MAX_CONCURRENCY
+        )
+        await get_http_client_manager().start()
+        if settings.API_KEY_REVOCATION_LISTENER:
+            start_api_key_revocation_listener()
+        if settings.PAIRING_WRITE_BEHIND:
+            await get_pairing_writer().start()
+        await get_pairing_job_manager().start()
     except Exception as e:
         raise RuntimeError(f"Error initializing Firebase: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Release service resources on shutdown.
+    """
+    await get_pairing_job_manager().close()
+    # Drain queued pairing records while Firestore is still available
+    await get_pairing_writer().close()
+    get_vision_manager(
+        credentials_path=settings.VISION_CREDENTIALS_PATH,
+        location=settings.VISION_AI_LOCATION,
+        max_concurrency=settings.VISION_MAX_CONCURRENCY
+    ).close()
+    await get_http_client_manager().close()
+    stop_api_key_revocation_listener()
+    mark_process_dead()
+
 @app.middleware("http")
 async def add_timing_header(request: Request, call_next):
     """
@@ -48,8 +93,24 @@ async def add_timing_header(request: Request, call_next):
     response = await call_next(request)
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
+
+    # Label by route template rather than raw path to keep label cardinality bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    ).observe(process_time)
     return response
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Expose Prometheus metrics in text format.
+    """
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 # Include routers
 app.include_router(users.router, prefix=settings.API_V1_STR)
 app.include_router(sessions.router, prefix=settings.API_V1_STR)
@@ -58,6 +119,8 @@ app.include_router(images.router, prefix=settings.API_V1_STR)
 
 if __name__ == "__main__":
     import uvicorn
+    # Workers import the app after this, so they all share the multiprocess directory
+    prepare_multiprocess_dir()
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
@@ -0,0 +1,84 @@
+from io import BytesIO
+from typing import Dict, List, Tuple
+import numpy as np
+from PIL import Image
+
+def load_pixels(content: bytes, sample_edge: int = 64) -> np.ndarray:
+    """
+    Decode an image and return its downsampled pixels as an (N, 3) float array.
+    """
+    with Image.open(BytesIO(content)) as image:
+        image.draft("RGB", (sample_edge, sample_edge))
+        image = image.convert("RGB")
+        image.thumbnail((sample_edge, sample_edge), Image.Resampling.BILINEAR)
+        return np.asarray(image, dtype=np.float32).reshape(-1, 3)
+
+def kmeans_colors(
+    pixels: np.ndarray,
+    k: int = 10,
+    iterations: int = 12,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster pixels with k-means (k-means++ seeding) and return cluster centers
+    and pixel counts, largest cluster first.
+    """
+    if len(pixels) == 0:
+        return np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    k = min(k, len(np.unique(pixels, axis=0)))
+
+    # k-means++ seeding
+    centers = np.empty((k, 3), dtype=np.float32)
+    centers[0] = pixels[rng.integers(len(pixels))]
+    closest = ((pixels - centers[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        centers[i] = pixels[rng.choice(len(pixels), p=closest / closest.sum())]
+        closest = np.minimum(closest, ((pixels - centers[i]) ** 2).sum(axis=1))
+
+    for _ in range(iterations):
+        distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        assignments = distances.argmin(axis=1)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.stack(
+            [np.bincount(assignments, weights=pixels[:, c], minlength=k) for c in range(3)],
+            axis=1
+        )
+        occupied = counts > 0
+        updated = centers.copy()
+        updated[occupied] = sums[occupied] / counts[occupied, None]
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+
+    distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    counts = np.bincount(distances.argmin(axis=1), minlength=k)
+    order = np.argsort(-counts, kind="stable")
+    order = order[counts[order] > 0]
+    return centers[order], counts[order]
+
+def analyze_dominant_colors(
+    content: bytes,
+    k: int = 10,
+    sample_edge: int = 64
+) -> List[Dict]:
+    """
+    Compute dominant colors locally in the same shape as Vision AI image properties.
+    """
+    pixels = load_pixels(content, sample_edge)
+    centers, counts = kmeans_colors(pixels, k)
+    fractions = counts / max(counts.sum(), 1)
+    rounded = np.rint(centers)
+    return [
+        {
+            'color': {
+                'red': float(color[0]),
+                'green': float(color[1]),
+                'blue': float(color[2])
+            },
+            'score': float(fraction),
+            'percentRounded': round(float(fraction) * 100)
+        }
+        for color, fraction in zip(rounded, fractions)
+    ]
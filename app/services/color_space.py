@@ -0,0 +1,102 @@
+from typing import Dict, List
+import numpy as np
+
+# Quantization of the RGB -> Lab/keyword lookup tables (bits kept per channel)
+LUT_BITS = 5
+LUT_SHIFT = 8 - LUT_BITS
+LUT_LEVELS = 1 << LUT_BITS
+
+# Colors further apart than this CIE94 distance count as no match
+MATCH_DELTA_E = 25.0
+
+PALETTE = {
+    "black": (20, 20, 20),
+    "white": (245, 245, 245),
+    "gray": (128, 128, 128),
+    "red": (200, 30, 35),
+    "orange": (240, 140, 30),
+    "yellow": (240, 215, 50),
+    "green": (50, 150, 60),
+    "blue": (20, 50, 220),
+    "purple": (130, 50, 170),
+    "pink": (240, 150, 190),
+    "brown": (130, 80, 40),
+}
+PALETTE_NAMES = np.array(list(PALETTE.keys()))
+
+# sRGB (D65) to CIE XYZ
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+
+def srgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert (..., 3) sRGB values in 0-255 to CIELAB (D65).
+    """
+    channels = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(
+        channels <= 0.04045,
+        channels / 12.92,
+        ((channels + 0.055) / 1.055) ** 2.4
+    )
+    xyz = (linear @ _RGB_TO_XYZ.T) / _WHITE_D65
+    epsilon = (6 / 29) ** 3
+    f = np.where(xyz > epsilon, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+def delta_e_94(lab1: np.ndarray, lab2: np.ndarray) -> np.ndarray:
+    """
+    CIE94 color difference (graphic arts weights) between broadcastable Lab arrays.
+    """
+    delta_l = lab1[..., 0] - lab2[..., 0]
+    chroma1 = np.hypot(lab1[..., 1], lab1[..., 2])
+    chroma2 = np.hypot(lab2[..., 1], lab2[..., 2])
+    delta_c = chroma1 - chroma2
+    delta_a = lab1[..., 1] - lab2[..., 1]
+    delta_b = lab1[..., 2] - lab2[..., 2]
+    delta_h_squared = np.maximum(delta_a ** 2 + delta_b ** 2 - delta_c ** 2, 0.0)
+    s_c = 1 + 0.045 * chroma1
+    s_h = 1 + 0.015 * chroma1
+    return np.sqrt(delta_l ** 2 + (delta_c / s_c) ** 2 + delta_h_squared / s_h ** 2)
+
+def _build_lookup_tables():
+    """Precompute Lab values and nearest palette keywords for every quantized RGB bin."""
+    centers = (np.arange(LUT_LEVELS) << LUT_SHIFT) + (1 << LUT_SHIFT) / 2
+    grid = np.stack(np.meshgrid(centers, centers, centers, indexing="ij"), axis=-1).reshape(-1, 3)
+    lab = srgb_to_lab(grid)
+    palette_lab = srgb_to_lab(np.array(list(PALETTE.values())))
+    keywords = delta_e_94(lab[:, None, :], palette_lab[None, :, :]).argmin(axis=1)
+    return lab.astype(np.float32), keywords.astype(np.uint8)
+
+LAB_LUT, KEYWORD_LUT = _build_lookup_tables()
+
+def lut_index(rgb: np.ndarray) -> np.ndarray:
+    """Map (..., 3) RGB values to their lookup table index."""
+    quantized = np.clip(np.asarray(rgb), 0, 255).astype(np.int64) >> LUT_SHIFT
+    return (quantized[..., 0] << (2 * LUT_BITS)) | (quantized[..., 1] << LUT_BITS) | quantized[..., 2]
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Look up the CIELAB value of (..., 3) RGB values."""
+    return LAB_LUT[lut_index(rgb)]
+
+def rgb_to_keyword(rgb: np.ndarray) -> np.ndarray:
+    """Look up the nearest palette keyword of (..., 3) RGB values."""
+    return PALETTE_NAMES[KEYWORD_LUT[lut_index(rgb)]]
+
+def colors_to_arrays(colors: List[Dict]):
+    """Convert Vision AI color dicts to (N, 3) RGB values and normalized weights."""
+    rgb = np.array(
+        [(c['color']['red'], c['color']['green'], c['color']['blue']) for c in colors],
+        dtype=np.float64
+    ).reshape(-1, 3)
+    weights = np.array([c.get('score') or 0.0 for c in colors], dtype=np.float64)
+    if weights.sum() <= 0:
+        weights = np.ones(len(colors))
+    return rgb, weights / max(weights.sum(), 1e-12)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import random
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Union
+import httpx
+from app.core.config import get_settings
+from app.core.http_client import HTTPClientManager, get_http_client_manager
+from app.core.metrics import UPSTREAM_ERRORS, track_upstream
+
+class EncryptionService:
+    """
+    Client for the Furina encryption service, sharing the pooled HTTP client.
+    """
+    # Only retry calls the service never processed: requests that were never sent,
+    # and responses that refuse the request outright
+    RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    RETRY_STATUSES = {429, 503}
+
+    def __init__(
+        self,
+        http: HTTPClientManager,
+        base_url: str,
+        api_key: str,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        max_concurrency: int = 16
+    ):
+        """
+        Initialize the client; requests are bounded by max_concurrency and retried
+        with jittered exponential backoff on connection failures, 429 and 503.
+        """
+        self.http = http
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def encrypt(self, text: Union[str, bytes, bytearray], sensitivity: str = "medium") -> httpx.Response:
+        """Encrypt Base64 text, given as a string or as ASCII bytes."""
+        if isinstance(text, str):
+            return await self._post("/encrypt", {"text": text, "sensitivity": sensitivity})
+        # Base64 needs no JSON escaping, so the body is built around the bytes
+        # directly instead of through an intermediate string
+        body = b"".join((b'{"text":"', text, b'","sensitivity":', json.dumps(sensitivity).encode(), b"}"))
+        return await self._post("/encrypt", content=body)
+
+    async def decrypt(self, key_id: str, cipher_text: str, iv: str) -> httpx.Response:
+        """Decrypt cipher text back to Base64 text."""
+        return await self._post("/decrypt", {"key_id": key_id, "cipher_text": cipher_text, "iv": iv})
+
+    async def _post(self, path: str, payload: Optional[Dict] = None, content: Optional[bytes] = None) -> httpx.Response:
+        """POST JSON, given as payload or as an encoded body, retrying transient failures."""
+        headers = {
+            "accept": "application/json",
+            "furina-encryption-service": self.api_key
+        }
+        if content is not None:
+            headers["content-type"] = "application/json"
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            error: Optional[Exception] = None
+            try:
+                async with self._semaphore:
+                    with track_upstream("furina", path):
+                        response = await self.http.client.post(
+                            url, headers=headers, json=payload, content=content, timeout=self.timeout
+                        )
+                if response.status_code >= 500 or response.status_code == 429:
+                    UPSTREAM_ERRORS.labels(upstream="furina", operation=path).inc()
+                if response.status_code not in self.RETRY_STATUSES:
+                    return response
+            except self.RETRY_ERRORS as e:
+                error = e
+
+            if attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            # Full jitter keeps retries from many requests from arriving together
+            delay = random.uniform(0, self.retry_backoff * (2 ** attempt))
+            attempt += 1
+            print(f"[{datetime.now()}] Retrying encryption service call {path} in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+@lru_cache()
+def get_encryption_service() -> EncryptionService:
+    """
+    Get or create a cached EncryptionService instance.
+    """
+    settings = get_settings()
+    return EncryptionService(
+        http=get_http_client_manager(),
+        base_url=settings.FURINA_API_URL,
+        api_key=settings.FURINA_API_KEY,
+        connect_timeout=settings.FURINA_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=settings.FURINA_READ_TIMEOUT_SECONDS,
+        max_retries=settings.FURINA_MAX_RETRIES,
+        retry_backoff=settings.FURINA_RETRY_BACKOFF_SECONDS,
+        max_concurrency=settings.FURINA_MAX_CONCURRENCY
+    )
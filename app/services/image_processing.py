@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional, Tuple
+import hashlib
+from PIL import Image, ImageOps
+
+CONTENT_TYPES = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+    'PNG': 'image/png',
+}
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp',
+    'image/png': 'png',
+    'image/gif': 'gif',
+}
+
+@dataclass
+class PreparedImage:
+    """An uploaded image plus the compact copy sent to Vision AI."""
+    original: bytes
+    original_content_type: str
+    compact: bytes
+    compact_content_type: str
+    digest: str
+
+    def for_storage(self, variant: str) -> Tuple[bytes, str]:
+        """Return the bytes and content type to store for the given variant."""
+        if variant == "compact":
+            return self.compact, self.compact_content_type
+        return self.original, self.original_content_type
+
+def extension_for(content_type: str) -> str:
+    """Get the file extension for an image content type."""
+    return EXTENSIONS.get(content_type, 'jpg')
+
+def prepare_image(
+    content: bytes,
+    content_type: str = 'image/jpeg',
+    max_edge: int = 1024,
+    image_format: str = 'JPEG',
+    quality: int = 85,
+    digest: Optional[str] = None
+) -> PreparedImage:
+    """
+    Decode an image once, apply its EXIF orientation, downscale it to max_edge
+    and re-encode a compact copy. Images Pillow cannot decode are passed through.
+    """
+    digest = digest or hashlib.sha256(content).hexdigest()
+    image_format = image_format.upper()
+
+    try:
+        with Image.open(BytesIO(content)) as image:
+            # Let JPEG decoding skip straight to a nearby power-of-two scale
+            image.draft("RGB", (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image)
+            if max(image.size) > max_edge:
+                image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+
+            buffer = BytesIO()
+            image.save(buffer, format=image_format, quality=quality)
+            compact = buffer.getvalue()
+    except Exception:
+        return PreparedImage(content, content_type, content, content_type, digest)
+
+    # Keep the original when re-encoding does not make it any smaller
+    if len(compact) >= len(content):
+        return PreparedImage(content, content_type, content, content_type, digest)
+
+    return PreparedImage(
+        original=content,
+        original_content_type=content_type,
+        compact=compact,
+        compact_content_type=CONTENT_TYPES.get(image_format, 'image/jpeg'),
+        digest=digest
+    )
@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from app.services import color_space
+
+COLOR_KEYWORDS = np.array(["light", "red", "brown", "green", "blue", "yellow", "gray"])
+
+def rgb_to_keyword_index(rgb: np.ndarray) -> np.ndarray:
+    """
+    Vectorized PairingService.map_colors_to_keywords rule: map (..., 3) RGB
+    values to indices into COLOR_KEYWORDS.
+    """
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    reddest = (red > green) & (red > blue)
+    conditions = [
+        (red > 100) & (green > 100) & (blue > 100),
+        reddest & (green < 100) & (blue < 100),
+        reddest,
+        (green > red) & (green > blue),
+        (blue > red) & (blue > green),
+        (np.abs(red - green) < 20) & (blue < 100),
+    ]
+    return np.select(conditions, [0, 1, 2, 3, 4, 5], default=6)
+
+@dataclass
+class MatchFeatures:
+    """Array-backed label, color and face features of one analyzed image."""
+    labels: np.ndarray
+    color_keywords: np.ndarray
+    colors_lab: np.ndarray
+    color_weights: np.ndarray
+    faces: np.ndarray
+    has_labels: bool
+    has_colors: bool
+    has_faces: bool
+
+    @classmethod
+    def from_analysis(cls,
+        labels: List[Dict],
+        colors: List[Dict],
+        faces: List[Dict]
+    ) -> "MatchFeatures":
+        """Build features from the labels/colors/faces dicts produced by Vision AI analysis."""
+        label_array = np.array(
+            list(dict.fromkeys(label['description'] for label in labels)),
+            dtype=object
+        )
+
+        rgb, color_weights = color_space.colors_to_arrays(colors)
+        keywords = np.zeros(len(COLOR_KEYWORDS), dtype=bool)
+        keywords[rgb_to_keyword_index(rgb)] = True
+
+        # Deduplicate through a set so faces are visited in the same order as
+        # the original per-pair face match, keeping float sums identical
+        face_set = set((f['roll_angle'], f['tilt_angle'], f['pan_angle']) for f in faces)
+        face_array = np.array(list(face_set), dtype=np.float64).reshape(-1, 3)
+
+        return cls(
+            labels=label_array,
+            color_keywords=keywords,
+            colors_lab=color_space.rgb_to_lab(rgb).astype(np.float64),
+            color_weights=color_weights,
+            faces=face_array,
+            has_labels=bool(labels),
+            has_colors=bool(colors),
+            has_faces=bool(faces)
+        )
+
+def perceptual_color_match_many(
+    original: MatchFeatures,
+    candidates: Sequence[MatchFeatures]
+) -> np.ndarray:
+    """Weighted CIE94 color match of one original against many candidates."""
+    count = len(candidates)
+    max_colors = max(len(c.colors_lab) for c in candidates)
+    if not len(original.colors_lab) or not max_colors:
+        return np.zeros(count)
+
+    padded = np.full((count, max_colors, 3), np.nan)
+    for i, candidate in enumerate(candidates):
+        padded[i, :len(candidate.colors_lab)] = candidate.colors_lab
+    distances = color_space.delta_e_94(original.colors_lab[None, :, None, :], padded[:, None, :, :])
+    distances = np.where(np.isnan(distances), np.inf, distances).min(axis=2)
+    similarity = np.maximum(0.0, 1.0 - distances / color_space.MATCH_DELTA_E)
+    return (similarity * original.color_weights).sum(axis=1)
+
+def score_many(
+    original: MatchFeatures,
+    candidates: Sequence[MatchFeatures],
+    color_mode: str = "keyword"
+) -> np.ndarray:
+    """
+    Score one original against many candidates in a single batched pass.
+    Returns a (len(candidates), 4) array of label, color, face and overall match,
+    identical to the original per-pair percentage match for each candidate.
+    With color_mode="perceptual", colors are compared by weighted CIE94 distance.
+    """
+    count = len(candidates)
+    if count == 0:
+        return np.empty((0, 4), dtype=np.float64)
+
+    # Label match: share of unique original labels present in each candidate
+    if len(original.labels):
+        owners = np.repeat(np.arange(count), [len(c.labels) for c in candidates])
+        all_labels = np.concatenate([c.labels for c in candidates])
+        common = np.bincount(owners, weights=np.isin(all_labels, original.labels), minlength=count)
+        label_match = common / len(original.labels)
+    else:
+        label_match = np.zeros(count)
+    both_empty = np.array([not original.has_labels and not c.has_labels for c in candidates])
+    label_match = np.where(both_empty, 1.0, label_match)
+
+    # Color match: share of original color keywords present in each candidate
+    keywords = np.stack([c.color_keywords for c in candidates])
+    original_keyword_count = original.color_keywords.sum()
+    if color_mode == "perceptual":
+        color_match = perceptual_color_match_many(original, candidates)
+    elif original_keyword_count:
+        color_match = (keywords & original.color_keywords).sum(axis=1) / original_keyword_count
+    else:
+        color_match = np.zeros(count)
+    both_empty = np.array([not original.has_colors and not c.has_colors for c in candidates])
+    color_match = np.where(both_empty, 1.0, color_match)
+
+    # Face match: best angle similarity per original face, averaged
+    face_match = np.zeros(count)
+    max_faces = max(len(c.faces) for c in candidates)
+    if len(original.faces) and max_faces:
+        padded = np.full((count, max_faces, 3), np.nan)
+        for i, candidate in enumerate(candidates):
+            padded[i, :len(candidate.faces)] = candidate.faces
+        diff = np.abs(original.faces[None, :, None, :] - padded[:, None, :, :])
+        similarity = 1.0 - ((diff[..., 0] + diff[..., 1] + diff[..., 2]) / 180.0)
+        similarity = np.maximum(0.0, similarity)
+        best = np.nanmax(np.where(np.isnan(similarity), -np.inf, similarity), axis=2)
+        # cumsum accumulates sequentially, like the reference Python loop
+        totals = np.cumsum(best, axis=1)[:, -1]
+        has_result_faces = np.array([len(c.faces) > 0 for c in candidates])
+        face_match = np.where(has_result_faces, totals / len(original.faces), 0.0)
+
+    any_faces = np.array([original.has_faces or c.has_faces for c in candidates])
+    overall = np.where(
+        any_faces,
+        (label_match + color_match + face_match) / 3,
+        (label_match + color_match) / 2
+    )
+    face_match = np.where(any_faces, face_match, 0.0)
+
+    return np.stack([label_match, color_match, face_match, overall], axis=1)
+
+def score(
+    original: MatchFeatures,
+    candidate: MatchFeatures,
+    color_mode: str = "keyword"
+) -> Tuple[float, float, float, float]:
+    """Score one original against one candidate."""
+    label_match, color_match, face_match, overall = score_many(original, [candidate], color_mode)[0]
+    return float(label_match), float(color_match), float(face_match), float(overall)
@@ -0,0 +1,354 @@
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+from app.core.config import get_settings
+from app.core.metrics import PAIRING_JOB_QUEUE_DEPTH, track_upstream
+from app.services.pairing_service import PairingService, get_pairing_service
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+def job_owner(auth: dict) -> str:
+    """Identify who may read a job: the API key, or the signed-in user."""
+    if 'api_key_id' in auth:
+        return f"key:{auth.get('api_key_id')}"
+    return f"user:{auth.get('uid')}"
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    """Format an optional timestamp for API responses."""
+    return value.isoformat() if value else None
+
+def job_status(job_id: str, record: Dict) -> Dict:
+    """Return a stored job record as returned to API clients."""
+    return {
+        'job_id': job_id,
+        'status': record.get('status'),
+        'submitted_at': _isoformat(record.get('submitted_at')),
+        'started_at': _isoformat(record.get('started_at')),
+        'finished_at': _isoformat(record.get('finished_at')),
+        'timings': record.get('timings') or {},
+        'result': record.get('result'),
+        'error': record.get('error')
+    }
+
+@dataclass
+class PairingJob:
+    """One queued pairing request and its outcome."""
+    id: str
+    owner: str
+    content: Optional[bytes]
+    content_type: str
+    digest: Optional[str]
+    keyword: str
+    include_faces: bool
+    candidates: int
+    auth: dict
+    status: str = "queued"
+    submitted_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    deadline: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_record(self) -> Dict:
+        """Return the job state as stored in Firestore."""
+        return {
+            'owner': self.owner,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'deadline': self.deadline,
+            'expires_at': self.expires_at,
+            'timings': self.timings,
+            'result': self.result,
+            'error': self.error
+        }
+
+    def to_dict(self) -> Dict:
+        """Return the job status as returned to API clients."""
+        return job_status(self.id, self.to_record())
+
+class PairingJobManager:
+    """
+    Bounded queue of pairing jobs run by an in-process worker pool.
+    Job state is written to the Firestore pairing_jobs collection, so any worker
+    process can report on any job. Unfinished jobs carry a deadline, refreshed when
+    they start running, after which they are reported as failed even if the process
+    running them died. Every job has an expires_at timestamp for a Firestore TTL policy.
+    """
+    JOB_COLLECTION = 'pairing_jobs'
+    SHUTDOWN_ERROR = "Server shut down before the job finished"
+    TIMEOUT_ERROR = "Pairing job did not finish in time"
+
+    def __init__(
+        self,
+        pairing_service: PairingService,
+        workers: int = 4,
+        max_queue_size: int = 100,
+        result_ttl: float = 3600.0,
+        max_run_time: float = 300.0,
+        poll_interval: float = 0.5
+    ):
+        """
+        Initialize the manager; call start() from a running event loop before use.
+        """
+        self.pairing_service = pairing_service
+        self.firebase = pairing_service.firebase
+        self.workers = max(1, workers)
+        self.max_queue_size = max_queue_size
+        self.result_ttl = result_ttl
+        self.max_run_time = max_run_time
+        self.poll_interval = poll_interval
+        # Unfinished jobs of this process; removed only once their outcome is stored
+        self.active: Dict[str, PairingJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker pool is running."""
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        """Start the worker pool."""
+        if self.running:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Stop accepting jobs, give queued jobs up to timeout seconds to finish,
+        then stop the worker pool and mark every unfinished job as failed.
+        """
+        if not self._tasks:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[{datetime.now()}] Pairing jobs shut down with {len(self.active)} jobs unfinished")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.gather(*(
+            self._finish(job, "failed", error=self.SHUTDOWN_ERROR)
+            for job in list(self.active.values())
+        ))
+
+    async def submit(self,
+        content: bytes,
+        content_type: str,
+        keyword: str,
+        include_faces: bool,
+        candidates: int,
+        auth: dict,
+        digest: Optional[str] = None
+    ) -> PairingJob:
+        """Queue a pairing job, rejecting it with 429 when the queue is full."""
+        if not self.running or self._closing:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Pairing jobs are not available"
+            )
+        queue_full = HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many pairing jobs queued, retry later",
+            headers={"Retry-After": "1"}
+        )
+        if self._queue.full():
+            raise queue_full
+
+        job = PairingJob(
+            id=str(uuid.uuid4()),
+            owner=job_owner(auth),
+            content=content,
+            content_type=content_type,
+            digest=digest,
+            keyword=keyword,
+            include_faces=include_faces,
+            candidates=candidates,
+            auth=auth
+        )
+        self._set_deadline(job, job.submitted_at)
+        try:
+            await self._save(job)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to queue pairing job: {str(e)}"
+            )
+
+        self.active[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Other submissions filled the queue while the job was being stored
+            await self._finish(job, "failed", error="Too many pairing jobs queued")
+            raise queue_full
+        PAIRING_JOB_QUEUE_DEPTH.set(self._queue.qsize())
+        return job
+
+    async def get(self, job_id: str, auth: dict, wait: float = 0) -> Dict:
+        """
+        Return the status of a job owned by the caller, or raise 404. With wait > 0,
+        hold up to that many seconds for the job to finish.
+        """
+        not_found = HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pairing job not found"
+        )
+        owner = job_owner(auth)
+
+        job = self.active.get(job_id)
+        if job is not None:
+            if job.owner != owner:
+                raise not_found
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(job.done.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            return job.to_dict()
+
+        # Jobs run by other worker processes are only visible through Firestore
+        loop = asyncio.get_running_loop()
+        wait_until = loop.time() + wait
+        while True:
+            record = await self._load(job_id)
+            if record is None or record.get('owner') != owner:
+                raise not_found
+            now = datetime.now(timezone.utc)
+            expires_at = record.get('expires_at')
+            if expires_at is not None and expires_at <= now:
+                raise not_found
+            if record.get('status') in FINISHED_STATUSES:
+                return job_status(job_id, record)
+            # The process running an overdue job died without recording its outcome
+            deadline = record.get('deadline')
+            if deadline is not None and deadline <= now:
+                return job_status(job_id, {**record, 'status': "failed", 'error': self.TIMEOUT_ERROR})
+            remaining = wait_until - loop.time()
+            if remaining <= 0:
+                return job_status(job_id, record)
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue depth and the number of unfinished jobs in this process."""
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'jobs': len(self.active)
+        }
+
+    async def _save(self, job: PairingJob) -> None:
+        """Write the job state to Firestore."""
+        with track_upstream("firestore", "pairing_job_write"):
+            await self.firebase.async_db.collection(self.JOB_COLLECTION).document(job.id).set(job.to_record())
+
+    async def _load(self, job_id: str) -> Optional[Dict]:
+        """Read a job's stored state, or None if it does not exist."""
+        with track_upstream("firestore", "pairing_job_read"):
+            doc = await self.firebase.async_db.collection(self.JOB_COLLECTION).document(job_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    async def _save_quietly(self, job: PairingJob) -> None:
+        """Write the job state, logging rather than raising on failure."""
+        try:
+            await self._save(job)
+        except Exception as e:
+            print(f"[{datetime.now()}] Failed to store pairing job {job.id} ({job.status}): {str(e)}")
+
+    def _set_deadline(self, job: PairingJob, start: datetime) -> None:
+        """Give an unfinished job max_run_time from start to finish."""
+        job.deadline = start + timedelta(seconds=self.max_run_time)
+        job.expires_at = job.deadline + timedelta(seconds=self.result_ttl)
+
+    async def _finish(self, job: PairingJob, outcome: str, error: Optional[str] = None) -> None:
+        """Record a job's outcome and release it from this process."""
+        job.status = outcome
+        job.error = error
+        job.finished_at = datetime.now(timezone.utc)
+        job.expires_at = job.finished_at + timedelta(seconds=self.result_ttl)
+        job.content = None
+        await self._save_quietly(job)
+        self.active.pop(job.id, None)
+        job.done.set()
+
+    async def _work(self) -> None:
+        """Run queued jobs one at a time."""
+        while True:
+            job = await self._queue.get()
+            PAIRING_JOB_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: PairingJob) -> None:
+        """Run one job through the pairing pipeline and record its outcome."""
+        if job.deadline <= datetime.now(timezone.utc):
+            await self._finish(job, "failed", error=self.TIMEOUT_ERROR)
+            return
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        self._set_deadline(job, job.started_at)
+        content, job.content = job.content, None  # Release the upload once the job owns it
+        await self._save_quietly(job)
+        try:
+            # Bounded so the job never outlives the deadline other processes see
+            record = await asyncio.wait_for(
+                self.pairing_service.pair_image(
+                    content=content,
+                    content_type=job.content_type,
+                    keyword=job.keyword,
+                    include_faces=job.include_faces,
+                    candidates=job.candidates,
+                    auth=job.auth,
+                    timings=job.timings,
+                    digest=job.digest
+                ),
+                self.max_run_time
+            )
+            job.result = {
+                'id': record['id'],
+                'original_image_uri': record['original_image_uri'],
+                'original_keyword': record['original_keyword'],
+                'result_image_uri': record['result_image_uri'],
+                'label_match': record['label_match'],
+                'color_match': record['color_match'],
+                'face_match': record['face_match'],
+                'overall_match': record['overall_match']
+            }
+            await self._finish(job, "succeeded")
+        except asyncio.TimeoutError:
+            print(f"[{datetime.now()}] Pairing job {job.id} timed out")
+            await self._finish(job, "failed", error=self.TIMEOUT_ERROR)
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"[{datetime.now()}] Pairing job {job.id} failed: {error}")
+            await self._finish(job, "failed", error=error)
+
+@lru_cache()
+def get_pairing_job_manager() -> PairingJobManager:
+    """
+    Get or create a cached PairingJobManager instance.
+    """
+    settings = get_settings()
+    return PairingJobManager(
+        pairing_service=get_pairing_service(),
+        workers=settings.PAIRING_JOB_WORKERS,
+        max_queue_size=settings.PAIRING_JOB_QUEUE_SIZE,
+        result_ttl=settings.PAIRING_JOB_RESULT_TTL_SECONDS,
+        max_run_time=settings.PAIRING_JOB_MAX_RUN_SECONDS
+    )
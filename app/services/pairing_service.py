@@ -1,58 +1,446 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta, timezone
+import hashlib
 import json
+import time
 import uuid
-from typing import Tuple, List, Dict
-import aiohttp
+import zlib
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, Tuple, List, Dict, Optional
+import httpx
 from fastapi import HTTPException
+from app.core.cache import TTLCache
 from app.core.config import get_settings
 from app.core.firebase import get_firebase_manager
+from app.core.http_client import ensure_public_url, get_http_client_manager
+from app.core.metrics import (
+    PIPELINE_STAGE_SECONDS,
+    SEARCH_FALLBACKS,
+    SEARCH_FALLBACK_QUERIES,
+    track_upstream,
+)
+from app.core.uploads import ImageUpload
 from app.core.vision import get_vision_manager
+from app.services import color_space, match_scoring
+from app.services.color_analysis import analyze_dominant_colors
+from app.services.match_scoring import MatchFeatures
+from app.services.pairing_writer import get_pairing_writer
+from app.services.image_processing import PreparedImage, extension_for, prepare_image
 from functools import lru_cache
 import random
-from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP, Query
 
 class PairingService:
+    URI_CACHE_COLLECTION = 'vision_uri_cache'
+    MAX_DOWNLOAD_REDIRECTS = 5
+    MAX_SEARCH_RESULTS = 10  # Custom Search returns at most 10 results per call
+    EXPORT_FLUSH_EVERY = 100  # gzip sync-flush interval for exports, in records
+    PAIRING_RESPONSE_FIELDS = [
+        'id',
+        'original_image_uri',
+        'original_keyword',
+        'result_image_uri',
+        'original_labels',
+        'original_colors',
+        'original_faces',
+        'result_labels',
+        'result_colors',
+        'result_faces',
+        'label_match',
+        'color_match',
+        'face_match',
+        'overall_match'
+    ]
+    PAIRING_SUMMARY_FIELDS = [
+        'original_image_uri',
+        'original_keyword',
+        'result_image_uri',
+        'color_match',
+        'face_match',
+        'overall_match'
+    ]
+
     def __init__(self):
         self.settings = get_settings()
         self.firebase = get_firebase_manager(self.settings.FIREBASE_CREDENTIALS_PATH)
+        self.http = get_http_client_manager()
+        self.writer = get_pairing_writer()
         self.vision = get_vision_manager(
             credentials_path=self.settings.VISION_CREDENTIALS_PATH,
-            location=self.settings.VISION_AI_LOCATION
+            location=self.settings.VISION_AI_LOCATION,
+            max_concurrency=self.settings.VISION_MAX_CONCURRENCY
+        )
+        self.analysis_cache = TTLCache(
+            max_entries=self.settings.VISION_CACHE_MAX_ENTRIES,
+            ttl=self.settings.VISION_CACHE_TTL_SECONDS,
+            max_bytes=self.settings.VISION_CACHE_MAX_BYTES,
+            name="vision_analysis"
+        )
+        self.uri_analysis_cache = TTLCache(
+            max_entries=self.settings.VISION_URI_CACHE_MAX_ENTRIES,
+            ttl=self.settings.VISION_URI_CACHE_TTL_SECONDS,
+            max_bytes=self.settings.VISION_URI_CACHE_MAX_BYTES,
+            name="vision_uri_analysis"
+        )
+        self.search_cache = TTLCache(
+            max_entries=self.settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl=self.settings.SEARCH_CACHE_TTL_SECONDS,
+            name="search"
+        )
+        self.search_negative_cache = TTLCache(
+            max_entries=self.settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl=self.settings.SEARCH_NEGATIVE_CACHE_TTL_SECONDS,
+            name="search_negative"
+        )
+        self._background_tasks = set()
+
+    def analysis_cache_key(self, digest: str, include_faces: bool) -> str:
+        """
+        Build the analysis cache key from an image digest, the color backend that
+        produced the colors, and the requested features.
+        """
+        return f"{digest}:{self.settings.COLOR_BACKEND}:{'faces' if include_faces else 'nofaces'}"
+
+    def lookup_analysis(self, 
+        cache: TTLCache, 
+        digest: str, 
+        include_faces: bool
+    ) -> Optional[Tuple[List[Dict], List[Dict], List[Dict]]]:
+        """Return cached labels, colors, and faces for a digest from the given cache, if any."""
+        keys = [self.analysis_cache_key(digest, include_faces)]
+        if not include_faces:
+            # A result that includes faces also answers a request without them
+            keys.append(self.analysis_cache_key(digest, True))
+        key, cached = cache.get_first(keys)
+        if cached is not None and key != keys[0]:
+            cached = (cached[0], cached[1], [])
+        return cached
+
+    def get_cached_analysis(self, 
+        digest: str, 
+        include_faces: bool
+    ) -> Optional[Tuple[List[Dict], List[Dict], List[Dict]]]:
+        """Return cached labels, colors, and faces for an image digest, if any."""
+        return self.lookup_analysis(self.analysis_cache, digest, include_faces)
+
+    def _spawn(self, coro) -> None:
+        """Run a best-effort coroutine in the background and keep a reference to it."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _load_uri_analysis(self, 
+        digest: str, 
+        include_faces: bool
+    ) -> Optional[Tuple[List[Dict], List[Dict], List[Dict]]]:
+        """Load a persisted URI analysis from Firestore, if present and not expired."""
+        keys = [self.analysis_cache_key(digest, include_faces)]
+        if not include_faces:
+            keys.append(self.analysis_cache_key(digest, True))
+
+        collection = self.firebase.async_db.collection(self.URI_CACHE_COLLECTION)
+        for key in keys:
+            doc = await collection.document(key).get()
+            if not doc.exists:
+                continue
+            data = doc.to_dict()
+            expires_at = data.get('expires_at')
+            if expires_at and expires_at <= datetime.now(timezone.utc):
+                continue
+            result = (data.get('labels', []), data.get('colors', []), data.get('faces', []))
+            self.uri_analysis_cache.set(key, result)
+            return result if include_faces else (result[0], result[1], [])
+        return None
+
+    async def _persist_uri_analysis(self, 
+        image_uri: str, 
+        digest: str, 
+        include_faces: bool, 
+        result: Tuple[List[Dict], List[Dict], List[Dict]]
+    ) -> None:
+        """Persist a URI analysis to Firestore so it survives restarts."""
+        key = self.analysis_cache_key(digest, include_faces)
+        labels, colors, faces = result
+        try:
+            doc_ref = self.firebase.async_db.collection(self.URI_CACHE_COLLECTION).document(key)
+            await doc_ref.set({
+                'image_uri': image_uri,
+                'include_faces': include_faces,
+                'color_backend': self.settings.COLOR_BACKEND,
+                'labels': labels,
+                'colors': colors,
+                'faces': faces,
+                # Pair with a Firestore TTL policy on this field to purge stale entries
+                'expires_at': datetime.now(timezone.utc) + timedelta(
+                    seconds=self.settings.VISION_URI_CACHE_TTL_SECONDS
+                )
+            })
+        except Exception as e:
+            print(f"[{datetime.now()}] Failed to persist URI analysis: {str(e)}")
+
+    async def prepare_image(self, 
+        content: bytes, 
+        content_type: str = 'image/jpeg',
+        digest: Optional[str] = None
+    ) -> PreparedImage:
+        """
+        Decode, orient and downscale an uploaded image into a compact copy for Vision AI.
+        Pass the digest computed while reading the upload to avoid hashing it again.
+        """
+        if not self.settings.IMAGE_PREPROCESS_ENABLED:
+            digest = digest or hashlib.sha256(content).hexdigest()
+            return PreparedImage(content, content_type, content, content_type, digest)
+
+        return await asyncio.to_thread(
+            prepare_image,
+            content,
+            content_type=content_type,
+            max_edge=self.settings.IMAGE_MAX_EDGE,
+            image_format=self.settings.IMAGE_COMPACT_FORMAT,
+            quality=self.settings.IMAGE_COMPACT_QUALITY,
+            digest=digest
         )
 
     async def analyze_image(self, 
         content: bytes, 
-        include_faces: bool
+        include_faces: bool,
+        digest: Optional[str] = None
     ) -> Tuple[List[Dict], List[Dict], List[Dict]]:
-        """Analyze image using Vision AI and return labels, colors, and faces."""
-        labels, colors, faces = [], [], []
-        
-        labels = await self.analyze_labels(content)
-        colors = await self.analyze_colors(content)
-        if include_faces:
-            faces = await self.analyze_faces(content)
-        
-        return labels, colors, faces
+        """
+        Analyze image using a single Vision AI request and return labels, colors, and faces.
+        The digest identifies the image for caching and defaults to the SHA-256 of content.
+        """
+        digest = digest or hashlib.sha256(content).hexdigest()
+        cached = self.get_cached_analysis(digest, include_faces)
+        if cached is not None:
+            return cached
+
+        try:
+            if self.settings.COLOR_BACKEND == "local":
+                response, colors = await asyncio.gather(
+                    self.vision.annotate_image(
+                        image_content=content, include_faces=include_faces, include_colors=False
+                    ),
+                    self.analyze_colors_locally(content)
+                )
+            else:
+                response = await self.vision.annotate_image(image_content=content, include_faces=include_faces)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Vision AI image analysis failed: {str(e)}"
+            )
+
+        result = self.parse_annotations(response, include_faces)
+        if self.settings.COLOR_BACKEND == "local":
+            result = (result[0], colors, result[2])
+        self.analysis_cache.set(self.analysis_cache_key(digest, include_faces), result)
+        return result
+    
+    async def analyze_images_batch(self, 
+        contents: List[bytes], 
+        digests: List[str],
+        include_faces: bool
+    ) -> List[object]:
+        """
+        Analyze many images with batched Vision AI requests. Returns, per image,
+        its labels, colors, and faces, or the HTTPException that image failed with.
+        """
+        results: List[object] = [self.get_cached_analysis(digest, include_faces) for digest in digests]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        local_colors = self.settings.COLOR_BACKEND == "local"
+        responses = await self.vision.batch_annotate_images(
+            [contents[i] for i in missing],
+            include_faces=include_faces,
+            include_colors=not local_colors
+        )
+        if local_colors:
+            colors = await asyncio.gather(
+                *(self.analyze_colors_locally(contents[i]) for i in missing),
+                return_exceptions=True
+            )
+
+        for position, (i, response) in enumerate(zip(missing, responses)):
+            # Each image in a batch succeeds or fails on its own
+            if isinstance(response, Exception):
+                results[i] = HTTPException(
+                    status_code=500,
+                    detail=f"Vision AI batch image analysis failed: {str(response)}"
+                )
+                continue
+            if response.error.message:
+                results[i] = HTTPException(
+                    status_code=500,
+                    detail=f"Vision AI image analysis failed: {response.error.message}"
+                )
+                continue
+            result = self.parse_annotations(response, include_faces)
+            if local_colors:
+                if isinstance(colors[position], Exception):
+                    results[i] = colors[position]
+                    continue
+                result = (result[0], colors[position], result[2])
+            self.analysis_cache.set(self.analysis_cache_key(digests[i], include_faces), result)
+            results[i] = result
+        return results
     
     async def analyze_image_from_uri(self, 
         image_uri: str, 
         include_faces: bool
     ) -> Tuple[List[Dict], List[Dict], List[Dict]]:
-        """Analyze image using Vision AI and return labels, colors, and faces from URI."""
-        labels, colors, faces = [], [], []
-        
-        labels = await self.analyze_labels_from_uri(image_uri)
-        colors = await self.analyze_colors_from_uri(image_uri)
-        if include_faces:
-            faces = await self.analyze_faces_from_uri(image_uri)
-        
+        """Analyze image using a single Vision AI request and return labels, colors, and faces from URI."""
+        digest = hashlib.sha256(image_uri.encode('utf-8')).hexdigest()
+        cached = self.lookup_analysis(self.uri_analysis_cache, digest, include_faces)
+        if cached is not None:
+            return cached
+
+        if self.settings.VISION_URI_CACHE_FIRESTORE:
+            try:
+                cached = await self._load_uri_analysis(digest, include_faces)
+            except Exception as e:
+                print(f"[{datetime.now()}] Failed to load URI analysis: {str(e)}")
+            if cached is not None:
+                return cached
+
+        try:
+            if self.settings.COLOR_BACKEND == "local":
+                response, colors = await asyncio.gather(
+                    self.vision.annotate_image_from_uri(
+                        image_uri=image_uri, include_faces=include_faces, include_colors=False
+                    ),
+                    self.analyze_colors_locally_from_uri(image_uri)
+                )
+            else:
+                response = await self.vision.annotate_image_from_uri(image_uri=image_uri, include_faces=include_faces)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Vision AI image analysis from URI failed: {str(e)}"
+            )
+
+        result = self.parse_annotations(response, include_faces)
+        if self.settings.COLOR_BACKEND == "local":
+            result = (result[0], colors, result[2])
+        self.uri_analysis_cache.set(self.analysis_cache_key(digest, include_faces), result)
+        if self.settings.VISION_URI_CACHE_FIRESTORE:
+            self._spawn(self._persist_uri_analysis(image_uri, digest, include_faces, result))
+        return result
+
+    async def analyze_colors_locally(self, content: bytes) -> List[Dict]:
+        """Compute dominant colors on CPU without a Vision AI request."""
+        try:
+            return await asyncio.to_thread(
+                analyze_dominant_colors,
+                content,
+                k=self.settings.LOCAL_COLOR_COUNT,
+                sample_edge=self.settings.LOCAL_COLOR_SAMPLE_EDGE
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Local color analysis failed: {str(e)}"
+            )
+
+    async def analyze_colors_locally_from_uri(self, image_uri: str) -> List[Dict]:
+        """Download an image and compute its dominant colors on CPU."""
+        content = await self.download_image(image_uri)
+        try:
+            return await self.analyze_colors_locally(content)
+        except HTTPException as e:
+            # Decode errors describe third-party content; log them instead of returning them
+            print(f"[{datetime.now()}] Failed to analyze downloaded image {image_uri}: {e.detail}")
+            raise HTTPException(
+                status_code=500,
+                detail="Local color analysis of downloaded image failed"
+            )
+
+    async def download_image(self, image_uri: str) -> bytes:
+        """
+        Download a third-party image through the shared HTTP client, bounded by
+        IMAGE_DOWNLOAD_MAX_BYTES. Only public http(s) hosts are fetched, and every
+        redirect hop is checked again before it is followed.
+        """
+        try:
+            url = image_uri
+            for _ in range(self.MAX_DOWNLOAD_REDIRECTS + 1):
+                await ensure_public_url(url)
+                chunks, size = [], 0
+                async with self.http.client.stream("GET", url, follow_redirects=False) as response:
+                    if response.has_redirect_location:
+                        url = str(response.url.join(response.headers["location"]))
+                        continue
+                    if response.status_code != 200:
+                        raise ValueError(f"status {response.status_code}")
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > self.settings.IMAGE_DOWNLOAD_MAX_BYTES:
+                            raise ValueError("image exceeds maximum download size")
+                        chunks.append(chunk)
+                return b"".join(chunks)
+            raise ValueError("too many redirects")
+        except Exception as e:
+            # Keep upstream details out of API responses
+            print(f"[{datetime.now()}] Failed to download image {image_uri}: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to download image"
+            )
+
+    def parse_annotations(self, 
+        response, 
+        include_faces: bool
+    ) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """Convert a combined Vision AI response into labels, colors, and faces."""
+        labels = self.parse_labels(response.label_annotations)
+        colors = self.parse_colors(response.image_properties_annotation)
+        faces = self.parse_faces(response.face_annotations) if include_faces else []
         return labels, colors, faces
 
+    @staticmethod
+    def parse_labels(labels) -> List[Dict]:
+        """Convert Vision AI label annotations into dicts."""
+        return [{'description': label.description, 'score': label.score} for label in labels]
+
+    @staticmethod
+    def parse_colors(properties) -> List[Dict]:
+        """Convert Vision AI image properties into dominant color dicts."""
+        return [
+            {
+                'color': {
+                    'red': color.color.red,
+                    'green': color.color.green,
+                    'blue': color.color.blue
+                },
+                'score': color.score,
+                'percentRounded': round(color.pixel_fraction * 100)
+            }
+            for color in properties.dominant_colors.colors
+        ]
+
+    @staticmethod
+    def parse_faces(faces) -> List[Dict]:
+        """Convert Vision AI face annotations into angle dicts."""
+        return [
+            {
+                'roll_angle': face.roll_angle,
+                'tilt_angle': face.tilt_angle,
+                'pan_angle': face.pan_angle
+            }
+            for face in faces
+        ]
+
     async def analyze_labels(self, content: bytes) -> List[Dict]:
         """Analyze image using Vision AI and return labels."""
         try:
             labels = await self.vision.detect_labels(image_content=content)
-            return [{'description': label.description, 'score': label.score} for label in labels]
+            return self.parse_labels(labels)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -63,7 +451,7 @@ class PairingService:
         """Analyze image using Vision AI and return labels from URI."""
         try:
             labels = await self.vision.detect_labels_from_uri(image_uri=image_uri)
-            return [{'description': label.description, 'score': label.score} for label in labels]
+            return self.parse_labels(labels)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -74,18 +462,7 @@ class PairingService:
         """Analyze image using Vision AI and return dominant colors."""
         try:
             properties = await self.vision.detect_image_properties(image_content=content)
-            return [
-                {
-                    'color': {
-                        'red': color.color.red,
-                        'green': color.color.green,
-                        'blue': color.color.blue
-                    },
-                    'score': color.score,
-                    'percentRounded': round(color.pixel_fraction * 100)
-                }
-                for color in properties.dominant_colors.colors
-            ]
+            return self.parse_colors(properties)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -96,18 +473,7 @@ class PairingService:
         """Analyze image using Vision AI and return dominant colors from URI."""
         try:
             properties = await self.vision.detect_image_properties_from_uri(image_uri=image_uri)
-            return [
-                {
-                    'color': {
-                        'red': color.color.red,
-                        'green': color.color.green,
-                        'blue': color.color.blue
-                    },
-                    'score': color.score,
-                    'percentRounded': round(color.pixel_fraction * 100)
-                }
-                for color in properties.dominant_colors.colors
-            ]
+            return self.parse_colors(properties)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -118,14 +484,7 @@ class PairingService:
         """Analyze image using Vision AI and return face annotations."""
         try:
             faces = await self.vision.detect_faces(image_content=content)
-            return [
-                {
-                    'roll_angle': face.roll_angle,
-                    'tilt_angle': face.tilt_angle,
-                    'pan_angle': face.pan_angle
-                }
-                for face in faces
-            ]
+            return self.parse_faces(faces)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -136,14 +495,7 @@ class PairingService:
         """Analyze image using Vision AI and return face annotations from URI."""
         try:
             faces = await self.vision.detect_faces_from_uri(image_uri=image_uri)
-            return [
-                {
-                    'roll_angle': face.roll_angle,
-                    'tilt_angle': face.tilt_angle,
-                    'pan_angle': face.pan_angle
-                }
-                for face in faces
-            ]
+            return self.parse_faces(faces)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -182,89 +534,211 @@ class PairingService:
 
     def map_colors_to_keywords(self, colors: List[Dict]) -> List[str]:
         """Map dominant colors to generalized keywords."""
-        def rgb_to_keyword(rgb: Tuple[int, int, int]) -> str:
-            red, green, blue = rgb
-            if red > 100 and green > 100 and blue > 100:
-                return "light"
-            elif red > green and red > blue:
-                return "red" if green < 100 and blue < 100 else "brown"
-            elif green > red and green > blue:
-                return "green"
-            elif blue > red and blue > green:
-                return "blue"
-            elif abs(red - green) < 20 and blue < 100:
-                return "yellow"
-            else:
-                return "gray"
-        
-        # Extract RGB and map to keywords
-        keywords = [
-            rgb_to_keyword(
-                (color['color']['red'], color['color']['green'], color['color']['blue'])
-            )
-            for color in colors
-        ]
+        if not colors:
+            return []
+
+        # Extract RGB and map to keywords with vectorized lookups
+        rgb, _ = color_space.colors_to_arrays(colors)
+        if self.settings.COLOR_MATCH_MODE == "perceptual":
+            keywords = color_space.rgb_to_keyword(rgb)
+        else:
+            keywords = match_scoring.COLOR_KEYWORDS[match_scoring.rgb_to_keyword_index(rgb)]
 
         # Deduplicate keywords
-        result = list(set(keywords))
+        result = list(set(keywords.tolist()))
 
         return result
 
-    async def search_image(self, search_term: str) -> str:
-        """Search for image using Google Custom Search."""
-        async with aiohttp.ClientSession() as session:
-            search_url = "https://customsearch.googleapis.com/customsearch/v1"
-            params = {
-                "key": self.settings.CUSTOM_SEARCH_API_KEY,
-                "cx": self.settings.CUSTOM_SEARCH_CX,
-                "q": search_term,
-                "searchType": "image",
-                "num": 1,
-                "safe": "active",
-                "imgType": "photo"
-            }
-            
-            try:
-                async with session.get(search_url, params=params) as response:
-                    if response.status != 200:
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Image search failed: {await response.text()}"
-                        )
-                    
-                    data = await response.json()
-                    if not data.get("items"):
-                        # Split search term into words
-                        words = search_term.split()
-                        
-                        # Try progressively shorter search terms
-                        while len(words) > 1:
-                            words.pop()  # Remove last word
-                            shorter_term = " ".join(words)
-                            
-                            # Try search with shorter term
-                            params["q"] = shorter_term
-                            async with session.get(search_url, params=params) as retry_response:
-                                retry_data = await retry_response.json()
-                                if retry_data.get("items"):
-                                    return retry_data["items"][0]["link"]
-                        
-                        # No images were found with any combination
-                        raise HTTPException(
-                            status_code=404,
-                            detail=f"No images found for search term or its variations: {search_term}"
-                        )
-                    
-                    return data["items"][0]["link"]
-                    
-            except aiohttp.ClientError as e:
+    @staticmethod
+    def normalize_search_term(search_term: str) -> str:
+        """Normalize a search term for caching: lowercase with collapsed whitespace."""
+        return " ".join(search_term.lower().split())
+
+    def _get_cached_links(self, query: str, num: int) -> Optional[List[str]]:
+        """Return cached links for a query if at least num results were requested before."""
+        cached = self.search_cache.get(query)
+        if cached is None:
+            return None
+        cached_num, links = cached
+        if cached_num < num:
+            return None
+        return links[:num]
+
+    async def _search_candidate(self, query: str, num: int = 1) -> List[str]:
+        """Return up to num image links for a single query, or an empty list if it has no results."""
+        if self.search_negative_cache.get(query) is not None:
+            return []
+        cached = self._get_cached_links(query, num)
+        if cached is not None:
+            return cached
+
+        search_url = "https://customsearch.googleapis.com/customsearch/v1"
+        params = {
+            "key": self.settings.CUSTOM_SEARCH_API_KEY,
+            "cx": self.settings.CUSTOM_SEARCH_CX,
+            "q": query,
+            "searchType": "image",
+            "num": num,
+            "safe": "active",
+            "imgType": "photo"
+        }
+
+        with track_upstream("custom_search", "list"):
+            response = await self.http.client.get(search_url, params=params)
+            if response.status_code != 200:
                 raise HTTPException(
                     status_code=500,
-                    detail=f"Error during image search: {str(e)}"
+                    detail=f"Image search failed: {response.text}"
                 )
+            data = response.json()
+
+        if not data.get("items"):
+            self.search_negative_cache.set(query, True)
+            return []
+
+        links = [item["link"] for item in data["items"][:num]]
+        self.search_cache.set(query, (num, links))
+        return links
+
+    async def _search_fallback(self, fallback: str, num: int):
+        """Search one fallback term, returning the error instead of raising it."""
+        SEARCH_FALLBACK_QUERIES.inc()
+        try:
+            return await self._search_candidate(fallback, num)
+        except (HTTPException, httpx.HTTPError) as e:
+            return e
+
+    @staticmethod
+    def _raise_if_all_failed(outcomes: List[object]) -> None:
+        """Raise the first error when every fallback search failed rather than missed."""
+        if outcomes and all(isinstance(outcome, Exception) for outcome in outcomes):
+            raise outcomes[0]
+
+    async def _search_fallbacks_sequentially(self, fallbacks: List[str], num: int) -> List[str]:
+        """Try fallback terms one at a time, longest first; a failed term counts as a miss."""
+        outcomes = []
+        for fallback in fallbacks:
+            links = await self._search_fallback(fallback, num)
+            if links and not isinstance(links, Exception):
+                return links
+            outcomes.append(links)
+        self._raise_if_all_failed(outcomes)
+        return []
+
+    async def _search_fallbacks_concurrently(self, fallbacks: List[str], num: int) -> List[str]:
+        """
+        Try all fallback terms at once and return the results of the longest one with a hit;
+        a failed term counts as a miss.
+        """
+        semaphore = asyncio.Semaphore(self.settings.SEARCH_FALLBACK_CONCURRENCY)
+
+        async def search(fallback: str):
+            async with semaphore:
+                return await self._search_fallback(fallback, num)
+
+        tasks = [asyncio.create_task(search(fallback)) for fallback in fallbacks]
+        try:
+            # Tasks are ordered longest first, so the first hit is the longest one
+            outcomes = []
+            for task in tasks:
+                links = await task
+                if links and not isinstance(links, Exception):
+                    return links
+                outcomes.append(links)
+            self._raise_if_all_failed(outcomes)
+            return []
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def search_images(self, search_term: str, num: int = 1) -> List[str]:
+        """Search for up to num images using Google Custom Search."""
+        num = max(1, min(num, self.MAX_SEARCH_RESULTS))
+        query = self.normalize_search_term(search_term)
+        cached = self._get_cached_links(query, num)
+        if cached is not None:
+            return cached
+
+        try:
+            links = await self._search_candidate(query, num)
+            if not links:
+                # Try progressively shorter search terms, skipping terms known to return nothing
+                words = query.split()
+                fallbacks = [" ".join(words[:n]) for n in range(len(words) - 1, 0, -1)]
+                SEARCH_FALLBACKS.inc()
+                if self.settings.SEARCH_FALLBACK_MODE == "concurrent":
+                    links = await self._search_fallbacks_concurrently(fallbacks, num)
+                else:
+                    links = await self._search_fallbacks_sequentially(fallbacks, num)
+
+        except httpx.HTTPError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error during image search: {str(e)}"
+            )
+
+        if links:
+            # Remember which variant answered the full term
+            self.search_cache.set(query, (num, links))
+            return links
+
+        # No images were found with any combination
+        raise HTTPException(
+            status_code=404,
+            detail=f"No images found for search term or its variations: {search_term}"
+        )
+
+    async def search_image(self, search_term: str) -> str:
+        """Search for image using Google Custom Search."""
+        links = await self.search_images(search_term, 1)
+        return links[0]
+
+    async def select_best_candidate(self,
+        candidate_uris: List[str],
+        original_labels: List[Dict],
+        original_colors: List[Dict],
+        original_faces: List[Dict],
+        include_faces: bool
+    ) -> Tuple[str, List[Dict], List[Dict], List[Dict], Tuple[float, float, float, float]]:
+        """Analyze candidate images concurrently and return the one with the highest overall match."""
+        semaphore = asyncio.Semaphore(self.settings.SEARCH_CANDIDATE_CONCURRENCY)
+
+        async def analyze(uri: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+            async with semaphore:
+                return await self.analyze_image_from_uri(uri, include_faces)
+
+        analyses = await asyncio.gather(
+            *(analyze(uri) for uri in candidate_uris),
+            return_exceptions=True
+        )
+
+        succeeded = [
+            (uri, analysis)
+            for uri, analysis in zip(candidate_uris, analyses)
+            # Skip candidates Vision AI could not fetch or analyze
+            if not isinstance(analysis, Exception)
+        ]
+        if not succeeded:
+            # Every candidate failed; surface the first error
+            raise analyses[0]
+
+        # Score every candidate against the original in one batched pass
+        with self.stage("scoring"):
+            scores = match_scoring.score_many(
+                MatchFeatures.from_analysis(original_labels, original_colors, original_faces),
+                [MatchFeatures.from_analysis(*analysis) for _, analysis in succeeded],
+                color_mode=self.settings.COLOR_MATCH_MODE
+            )
+        best = int(scores[:, 3].argmax())
+        uri, (result_labels, result_colors, result_faces) = succeeded[best]
+        label_match, color_match, face_match, overall_match = (float(value) for value in scores[best])
+
+        return uri, result_labels, result_colors, result_faces, (label_match, color_match, face_match, overall_match)
             
     async def store_image_to_storage(self, 
         content: bytes, 
+        content_type: str = 'image/jpeg'
     ) -> str:
         """Store original image to Firebase Storage."""
         original_image_id = str(uuid.uuid4())
@@ -272,10 +746,16 @@ class PairingService:
         try:
             bucket = self.firebase.storage
 
-            # Store original image
-            original_blob = bucket.blob(f"originals/{original_image_id}.jpg")
-            original_blob.upload_from_string(content, content_type='image/jpeg')
-            original_blob.make_public()
+            # Store original image as publicly readable in a single upload request,
+            # off the event loop so it overlaps with the result analysis
+            original_blob = bucket.blob(f"originals/{original_image_id}.{extension_for(content_type)}")
+            with track_upstream("storage", "upload"):
+                await asyncio.to_thread(
+                    original_blob.upload_from_string,
+                    content,
+                    content_type=content_type,
+                    predefined_acl='publicRead'
+                )
 
             # # Store result image
             # async with aiohttp.ClientSession() as session:
@@ -299,7 +779,77 @@ class PairingService:
                 detail=f"Failed to store images to Firebase Storage: {str(e)}"
             )
 
-    def store_pairing_record(self, 
+    def build_pairing_record(self,
+        original_image_uri: str,
+        original_keyword: str,
+        result_image_uri: str,
+        original_labels: List[Dict],
+        original_colors: List[Dict],
+        original_faces: List[Dict],
+        result_labels: List[Dict],
+        result_colors: List[Dict],
+        result_faces: List[Dict],
+        label_match: float,
+        color_match: float,
+        face_match: float,
+        overall_match: float,
+        auth: dict
+    ) -> Tuple[str, Dict]:
+        """Build a pairing record and its document ID without writing it."""
+        pairing_id = str(uuid.uuid4())
+        record = {
+            'id': pairing_id,
+            'timestamp': SERVER_TIMESTAMP,
+            'original_image_uri': original_image_uri,
+            'original_keyword': original_keyword,
+            'result_image_uri': result_image_uri,
+            'original_labels': original_labels,
+            'original_colors': original_colors,
+            'original_faces': original_faces,
+            'result_labels': result_labels,
+            'result_colors': result_colors,
+            'result_faces': result_faces,
+            'label_match': label_match,
+            'color_match': color_match,
+            'face_match': face_match,
+            'overall_match': overall_match
+        }
+
+        # Add auth-specific data
+        if 'api_key_id' in auth:
+            record.update({
+                'api_key_id': auth.get('api_key_id'),
+                'client_id': auth.get('client_id'),
+            })
+        else:
+            record.update({
+                'user_id': auth.get('uid'),
+                'user_email': auth.get('email')
+            })
+
+        return pairing_id, record
+
+    def pairing_response(self, record: Dict) -> Dict:
+        """Select the fields of a pairing record returned to API clients."""
+        return {key: record[key] for key in self.PAIRING_RESPONSE_FIELDS}
+
+    async def store_pairing_records_batch(self, records: List[Tuple[str, Dict]]) -> None:
+        """Write many pairing records with Firestore batched writes."""
+        try:
+            collection = self.firebase.async_db.collection('image_pairings')
+            for start in range(0, len(records), self.writer.MAX_BATCH_SIZE):
+                batch = self.firebase.async_db.batch()
+                for pairing_id, record in records[start:start + self.writer.MAX_BATCH_SIZE]:
+                    batch.set(collection.document(pairing_id), record)
+                with track_upstream("firestore", "pairing_batch_write"):
+                    await batch.commit()
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to store pairing records: {str(e)}"
+            )
+
+    async def store_pairing_record(self, 
         original_image_uri: str,
         original_keyword: str,
         result_image_uri: str,
@@ -330,58 +880,21 @@ class PairingService:
                 raise TypeError(f"Unsupported type: {type(data)} - {data}")
 
         try:
-            pairing_id = str(uuid.uuid4())
-            timestamp = SERVER_TIMESTAMP
-
-            record = {
-                'id': pairing_id,
-                'timestamp': timestamp,
-                'original_image_uri': original_image_uri,
-                'original_keyword': original_keyword,
-                'result_image_uri': result_image_uri,
-                'original_labels': original_labels,
-                'original_colors': original_colors,
-                'original_faces': original_faces,
-                'result_labels': result_labels,
-                'result_colors': result_colors,
-                'result_faces': result_faces,
-                'label_match': label_match,
-                'color_match': color_match,
-                'face_match': face_match,
-                'overall_match': overall_match
-            }
-
-            # Add auth-specific data
-            if 'api_key_id' in auth:
-                record.update({
-                    'api_key_id': auth.get('api_key_id'),
-                    'client_id': auth.get('client_id'),
-                })
-            else:
-                record.update({
-                    'user_id': auth.get('uid'),
-                    'user_email': auth.get('email')
-                })
+            pairing_id, record = self.build_pairing_record(
+                original_image_uri, original_keyword, result_image_uri,
+                original_labels, original_colors, original_faces,
+                result_labels, result_colors, result_faces,
+                label_match, color_match, face_match, overall_match,
+                auth
+            )
 
-            # Store record
-            self.firebase.db.collection('image_pairings').document(pairing_id).set(record)
+            # Store record, off the response path when write-behind is running;
+            # write directly if the queue stays full
+            if not (self.settings.PAIRING_WRITE_BEHIND and await self.writer.enqueue(pairing_id, record)):
+                with track_upstream("firestore", "pairing_write"):
+                    await self.firebase.async_db.collection('image_pairings').document(pairing_id).set(record)
             
-            return {
-                'id': pairing_id,
-                'original_image_uri': original_image_uri,
-                'original_keyword': original_keyword,
-                'result_image_uri': result_image_uri,
-                'original_labels': original_labels,
-                'original_colors': original_colors,
-                'original_faces': original_faces,
-                'result_labels': result_labels,
-                'result_colors': result_colors,
-                'result_faces': result_faces,
-                'label_match': label_match,
-                'color_match': color_match,
-                'face_match': face_match,
-                'overall_match': overall_match
-            }
+            return self.pairing_response(record)
             
         except Exception as e:
             raise HTTPException(
@@ -389,105 +902,202 @@ class PairingService:
                 detail=f"Failed to store pairing record: {str(e)}"
             )
         
-    def calculate_percentage_match(self,
-        original_labels: List[Dict],
-        original_colors: List[Dict],
-        original_faces: List[Dict],
-        result_labels: List[Dict],
-        result_colors: List[Dict],
-        result_faces: List[Dict]
-    ) -> tuple[float, float, float, float]:
-        """Calculate percentage match between original and result images."""
-        # Calculate label match percentage
-        # Early return if no labels
-        if not original_labels and not result_labels:
-            label_match = 1.0
-        else: label_match = self.calculate_label_match(original_labels, result_labels)
-        
-        # Calculate color match percentage
-        if not original_colors and not result_colors:
-            color_match = 1.0
-        else: color_match = self.calculate_color_match(original_colors, result_colors)
-        
-        # Calculate face match percentage
-        if not original_faces and not result_faces:
-            face_match = 0.0
-            percentage = (label_match + color_match) / 2
-        else: 
-            face_match = self.calculate_face_match(original_faces, result_faces)
-            percentage = (label_match + color_match + face_match) / 3
-        
-        print(label_match, color_match, face_match)
+    @contextmanager
+    def stage(self, name: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """Time one pipeline stage, recording its duration in timings and metrics."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            PIPELINE_STAGE_SECONDS.labels(stage=name).observe(elapsed)
+            if timings is not None:
+                timings[name] = elapsed
+
+    async def pair_image(self,
+        content: bytes,
+        content_type: str,
+        keyword: str,
+        include_faces: bool,
+        candidates: int,
+        auth: dict,
+        timings: Optional[Dict[str, float]] = None,
+        digest: Optional[str] = None
+    ) -> Dict:
+        """
+        Run the full pairing pipeline for one uploaded image and return the stored record.
+        Stage durations in seconds are written to timings when given.
+        """
+        with self.stage("preprocess", timings):
+            # Downscale and recompress a copy for Vision AI
+            prepared = await self.prepare_image(content, content_type, digest=digest)
 
-        return label_match, color_match, face_match, percentage
+        with self.stage("analyze", timings):
+            original_labels, original_colors, original_faces = await self.analyze_image(
+                prepared.compact, include_faces, digest=prepared.digest
+            )
 
+        with self.stage("search", timings):
+            search_term = self.build_search_term(keyword, original_labels, original_colors)
+            candidate_uris = await self.search_images(search_term, candidates)
 
-    def calculate_label_match(self, original_labels: List[Dict], result_labels: List[Dict]) -> float:
-        """Identify common labels percentage."""
-        original_set = set(label['description'] for label in original_labels)
-        result_set = set(label['description'] for label in result_labels)
+        async def store() -> str:
+            with self.stage("storage", timings):
+                return await self.store_image_to_storage(
+                    *prepared.for_storage(self.settings.STORAGE_IMAGE_VARIANT)
+                )
 
-        # Calculate common label
-        if not original_set:  # Avoid division by zero
-            return 0.0
-        common_labels = original_set.intersection(result_set)
+        async def select():
+            with self.stage("candidates", timings):
+                return await self.select_best_candidate(
+                    candidate_uris=candidate_uris,
+                    original_labels=original_labels,
+                    original_colors=original_colors,
+                    original_faces=original_faces,
+                    include_faces=include_faces
+                )
 
-        percentage = len(common_labels) / len(original_set)
-        
-        return percentage
-    
-    def calculate_color_match(self, original_colors: List[Dict], result_colors: List[Dict]) -> float:
-        """Identify common colors percentage."""
-        
-        # Convert RGB to color keywords for comparison
-        original_keywords = self.map_colors_to_keywords(original_colors)
-        result_keywords = self.map_colors_to_keywords(result_colors)
-        
-        # Handle empty case
-        if not original_keywords:
-            return 0.0
-        
-        # Find common colors
-        common_colors = []
-        for original_color in original_keywords:
-            if original_color in result_keywords:
-                common_colors.append(original_color)
-        
-        return len(common_colors) / len(original_keywords)
-    
-    def calculate_face_match(self, original_faces: List[Dict], result_faces: List[Dict]) -> float:
-        """Calculate face match percentage."""
-        original_set = set((face['roll_angle'], face['tilt_angle'], face['pan_angle']) for face in original_faces)
-        result_set = set((face['roll_angle'], face['tilt_angle'], face['pan_angle']) for face in result_faces)
-        
-        # Handle empty sets
-        if not original_set or not result_set:
-            return 0.0
-        
-        # Calculate roll, tilt, and pan similarity
-        total_similarity = 0.0
-        for original_face in original_set:
-            face_similarities = []
-            for result_face in result_set:
-                roll_diff = abs(original_face[0] - result_face[0])
-                tilt_diff = abs(original_face[1] - result_face[1])
-                pan_diff = abs(original_face[2] - result_face[2])
-                # Calculate similarity score (1 - normalized difference)
-                similarity = 1.0 - ((roll_diff + tilt_diff + pan_diff) / 180.0)
-                face_similarities.append(max(0.0, similarity))
-            if face_similarities:
-                total_similarity += max(face_similarities)
+        # Run storage and candidate analysis concurrently
+        original_uri, (result_uri, result_labels, result_colors, result_faces, scores) = await asyncio.gather(
+            store(),
+            select()
+        )
+        label_match, color_match, face_match, overall_match = scores
+
+        with self.stage("record", timings):
+            return await self.store_pairing_record(
+                original_image_uri=original_uri,
+                original_keyword=keyword,
+                result_image_uri=result_uri,
+                original_labels=original_labels,
+                original_colors=original_colors,
+                original_faces=original_faces,
+                result_labels=result_labels,
+                result_colors=result_colors,
+                result_faces=result_faces,
+                label_match=label_match,
+                color_match=color_match,
+                face_match=face_match,
+                overall_match=overall_match,
+                auth=auth
+            )
+
+    async def pair_images_batch(self,
+        items: List[Tuple[ImageUpload, str]],
+        include_faces: bool,
+        candidates: int,
+        auth: dict
+    ) -> List[Dict]:
+        """
+        Pair many (upload, keyword) images. Analysis runs in Vision AI
+        batches, searches and uploads run under PAIRING_BATCH_CONCURRENCY, and records
+        are written in Firestore batches. Returns one result or error per item, in order.
+        """
+        prepared = await asyncio.gather(
+            *(self.prepare_image(upload.content, upload.content_type, digest=upload.digest) for upload, _ in items)
+        )
+        analyses = await self.analyze_images_batch(
+            [image.compact for image in prepared],
+            [image.digest for image in prepared],
+            include_faces
+        )
+        semaphore = asyncio.Semaphore(self.settings.PAIRING_BATCH_CONCURRENCY)
+
+        async def pair(image: PreparedImage, keyword: str, analysis) -> Tuple[str, Dict]:
+            if isinstance(analysis, Exception):
+                raise analysis
+            original_labels, original_colors, original_faces = analysis
+            async with semaphore:
+                search_term = self.build_search_term(keyword, original_labels, original_colors)
+                candidate_uris = await self.search_images(search_term, candidates)
+                original_image_uri, (result_image_uri, result_labels, result_colors, result_faces, scores) = await asyncio.gather(
+                    self.store_image_to_storage(*image.for_storage(self.settings.STORAGE_IMAGE_VARIANT)),
+                    self.select_best_candidate(
+                        candidate_uris, original_labels, original_colors, original_faces, include_faces
+                    )
+                )
+            return self.build_pairing_record(
+                original_image_uri, keyword, result_image_uri,
+                original_labels, original_colors, original_faces,
+                result_labels, result_colors, result_faces,
+                *scores,
+                auth
+            )
+
+        outcomes = await asyncio.gather(
+            *(pair(image, keyword, analysis) for image, (_, keyword), analysis in zip(prepared, items, analyses)),
+            return_exceptions=True
+        )
+
+        records = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+        if records:
+            try:
+                await self.store_pairing_records_batch(records)
+            except HTTPException as e:
+                outcomes = [e if not isinstance(outcome, Exception) else outcome for outcome in outcomes]
+
+        results = []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, Exception):
+                detail = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+                results.append({'index': index, 'status': 'error', 'error': detail})
+            else:
+                _, record = outcome
+                results.append({
+                    'index': index,
+                    'status': 'ok',
+                    'id': record['id'],
+                    'original_image_uri': record['original_image_uri'],
+                    'original_keyword': record['original_keyword'],
+                    'result_image_uri': record['result_image_uri'],
+                    'label_match': record['label_match'],
+                    'color_match': record['color_match'],
+                    'face_match': record['face_match'],
+                    'overall_match': record['overall_match']
+                })
+        return results
         
-        # Return average similarity normalized by number of faces in original image
-        percentage = total_similarity / len(original_set)
+    def pairing_records_query(self, auth: dict, scope: str = "key", ordered: bool = True):
+        """
+        Build the caller's image_pairings query, newest first unless ordered is False.
+        API key callers list by api_key_id, or by client_id with scope="client".
+        Each filter needs a composite index with timestamp descending (see firestore.indexes.json).
+        """
+        collection = self.firebase.async_db.collection('image_pairings')
+        if 'api_key_id' in auth:
+            if scope == "client":
+                query = collection.where('client_id', '==', auth.get('client_id'))
+            else:
+                query = collection.where('api_key_id', '==', auth['api_key_id'])
+        else:
+            query = collection.where('user_id', '==', auth['uid'])
+        if not ordered:
+            return query
+        return query.order_by('timestamp', direction=Query.DESCENDING)
 
-        return percentage
-    
-    def get_pairing_records(self, auth: dict) -> List[Dict]:
-        """Retrieve pairing records from Firestore."""
+    async def get_pairing_records(self, 
+        auth: dict, 
+        limit: int = 50, 
+        start_after: Optional[str] = None, 
+        scope: str = "key"
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Retrieve one page of pairing record summaries from Firestore.
+        Returns the records and the cursor for the next page, if any.
+        """
         try:
-            # Get records
-            records = self.firebase.db.collection('image_pairings').where('user_id', '==', auth['uid']).stream()
+            query = self.pairing_records_query(auth, scope)
+            if start_after:
+                cursor = await self.firebase.async_db.collection('image_pairings').document(
+                    start_after
+                ).get(field_paths=['timestamp'])
+                if not cursor.exists:
+                    raise HTTPException(status_code=400, detail="Invalid start_after cursor")
+                query = query.start_after(cursor)
+
+            # Fetch only the summary fields, plus one extra record to detect a next page
+            query = query.select(self.PAIRING_SUMMARY_FIELDS).limit(limit + 1)
+            records = [record async for record in query.stream()]
             
             # Convert records to list and filter required fields
             result = [
@@ -500,17 +1110,82 @@ class PairingService:
                     "face_match": record.get("face_match"),
                     "overall_match": record.get("overall_match")
                 }
-                for record in records
+                for record in records[:limit]
             ]
+            next_cursor = result[-1]["id"] if len(records) > limit else None
             
-            return result
+            return result, next_cursor
         
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to retrieve pairing records: {str(e)}"
             )
 
+    async def export_pairing_records(self, 
+        auth: dict, 
+        scope: str = "key", 
+        compress: bool = False
+    ) -> AsyncIterator[bytes]:
+        """
+        Start streaming the caller's full pairing records as newline-delimited JSON,
+        optionally gzip-compressed, one Firestore document at a time.
+        The first document is fetched before returning, so early failures raise 500.
+        """
+        records = self.pairing_records_query(auth, scope, ordered=False).stream().__aiter__()
+        try:
+            first = await records.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to export pairing records: {str(e)}"
+            )
+        return self._stream_export(first, records, compress)
+
+    async def _stream_export(self, 
+        first, 
+        records: AsyncIterator, 
+        compress: bool
+    ) -> AsyncIterator[bytes]:
+        """Encode exported records, starting with the already fetched first one."""
+        def to_json(value):
+            if isinstance(value, datetime):
+                return value.isoformat()
+            return str(value)
+
+        async def all_records():
+            if first is not None:
+                yield first
+                async for record in records:
+                    yield record
+
+        compressor = zlib.compressobj(wbits=31) if compress else None  # gzip container
+        count = 0
+        try:
+            async for record in all_records():
+                line = json.dumps({'id': record.id, **record.to_dict()}, default=to_json) + "\n"
+                chunk = line.encode('utf-8')
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                    # Flush periodically (and on the first record) so bytes go out early
+                    if count % self.EXPORT_FLUSH_EVERY == 0:
+                        chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+                count += 1
+                if chunk:
+                    yield chunk
+        except Exception as e:
+            # Headers are already sent; abort the response rather than finish a
+            # stream (and gzip trailer) that would look complete
+            print(f"[{datetime.now()}] Pairing export failed after {count} records: {str(e)}")
+            raise
+
+        if compressor:
+            yield compressor.flush()
+
 @lru_cache()
 def get_pairing_service() -> PairingService:
     return PairingService()
\ No newline at end of file
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from app.core.config import get_settings
+from app.core.firebase import FirebaseManager, get_firebase_manager
+from app.core.metrics import (
+    PAIRING_WRITE_FAILURES,
+    PAIRING_WRITE_FLUSH_SECONDS,
+    PAIRING_WRITE_QUEUE_DEPTH,
+    track_upstream,
+)
+
+class PairingRecordWriter:
+    """
+    Write-behind queue that flushes pairing records to Firestore in batched writes.
+    """
+    MAX_BATCH_SIZE = 500  # Firestore limit for a single batched write
+
+    def __init__(
+        self,
+        firebase: FirebaseManager,
+        collection: str = 'image_pairings',
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        enqueue_timeout: float = 1.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5
+    ):
+        """
+        Initialize the writer; call start() from a running event loop before use.
+        """
+        self.firebase = firebase
+        self.collection = collection
+        self.max_queue_size = max_queue_size
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether the background flush task is running."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start the background flush task."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Flush every queued record, then stop the background task."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[{datetime.now()}] Pairing writer shut down with {self._queue.qsize()} records unwritten")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def enqueue(self, doc_id: str, record: Dict) -> bool:
+        """
+        Queue a record for writing, waiting up to enqueue_timeout for space.
+        Returns False when the writer is not running or the queue stays full.
+        """
+        if not self.running:
+            return False
+        try:
+            await asyncio.wait_for(self._queue.put((doc_id, record)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            return False
+        PAIRING_WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth, write counters and flush latency."""
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'written': self.written,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'last_flush_seconds': self.last_flush_seconds,
+            'average_flush_seconds': self.total_flush_seconds / self.flushes if self.flushes else 0.0
+        }
+
+    async def _run(self) -> None:
+        """Collect records into batches and flush them by size or time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, Dict]]) -> None:
+        """
+        Write one batch of records to Firestore, retrying with jittered backoff.
+        If the batch keeps failing, each record is written on its own.
+        """
+        start_time = time.perf_counter()
+        try:
+            await self._commit_with_retries(batch)
+            self.written += len(batch)
+        except Exception as e:
+            print(f"[{datetime.now()}] Failed to flush {len(batch)} pairing records, writing them individually: {str(e)}")
+            await self._write_individually(batch)
+        finally:
+            self.flushes += 1
+            self.last_flush_seconds = time.perf_counter() - start_time
+            self.total_flush_seconds += self.last_flush_seconds
+            PAIRING_WRITE_FLUSH_SECONDS.observe(self.last_flush_seconds)
+            PAIRING_WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _commit(self, batch: List[Tuple[str, Dict]]) -> None:
+        """Commit records in one batched write."""
+        write_batch = self.firebase.async_db.batch()
+        collection = self.firebase.async_db.collection(self.collection)
+        for doc_id, record in batch:
+            write_batch.set(collection.document(doc_id), record)
+        with track_upstream("firestore", "pairing_batch_write"):
+            await write_batch.commit()
+
+    async def _commit_with_retries(self, batch: List[Tuple[str, Dict]]) -> None:
+        """Commit a batch, retrying up to max_retries times."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._commit(batch)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(random.uniform(0, self.retry_backoff * (2 ** attempt)))
+
+    async def _write_individually(self, batch: List[Tuple[str, Dict]]) -> None:
+        """
+        Write records one at a time so one bad record cannot sink the batch.
+        Records that still fail are logged in full so they can be replayed.
+        """
+        collection = self.firebase.async_db.collection(self.collection)
+        for doc_id, record in batch:
+            try:
+                with track_upstream("firestore", "pairing_write"):
+                    await collection.document(doc_id).set(record)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                PAIRING_WRITE_FAILURES.inc()
+                print(
+                    f"[{datetime.now()}] Lost pairing record {doc_id}: {str(e)} "
+                    f"{json.dumps(record, default=str)}"
+                )
+
+@lru_cache()
+def get_pairing_writer() -> PairingRecordWriter:
+    """
+    Get or create a cached PairingRecordWriter instance.
+    """
+    settings = get_settings()
+    return PairingRecordWriter(
+        firebase=get_firebase_manager(settings.FIREBASE_CREDENTIALS_PATH),
+        max_queue_size=settings.PAIRING_WRITE_QUEUE_SIZE,
+        batch_size=settings.PAIRING_WRITE_BATCH_SIZE,
+        flush_interval=settings.PAIRING_WRITE_FLUSH_INTERVAL_SECONDS,
+        enqueue_timeout=settings.PAIRING_WRITE_ENQUEUE_TIMEOUT_SECONDS,
+        max_retries=settings.PAIRING_WRITE_MAX_RETRIES,
+        retry_backoff=settings.PAIRING_WRITE_RETRY_BACKOFF_SECONDS
+    )
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+# app.core.config validates its settings on import; give tests placeholder values
+# so modules that read settings can be imported without real credentials
+_credentials = os.path.join(tempfile.mkdtemp(), "credentials.json")
+with open(_credentials, "w") as f:
+    f.write("{}")
+
+for name, value in {
+    "GOOGLE_APPLICATION_CREDENTIALS": _credentials,
+    "VISION_CREDENTIALS_PATH": _credentials,
+    "FIREBASE_API_KEY": "test",
+    "STORAGE_BUCKET": "test",
+    "GOOGLE_CLOUD_PROJECT": "test",
+    "CUSTOM_SEARCH_API_KEY": "test",
+    "CUSTOM_SEARCH_CX": "test",
+    "FURINA_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
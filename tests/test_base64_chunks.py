@@ -0,0 +1,79 @@
+import asyncio
+import base64
+import io
+import os
+import pytest
+from fastapi import UploadFile
+from app.core.base64_chunks import (
+    BASE64_RAW_CHUNK,
+    BASE64_TEXT_CHUNK,
+    base64_to_chunks,
+    decoded_base64_length,
+    encoded_base64_length,
+    image_to_base64,
+    is_valid_base64,
+)
+
+class ShortReads(io.BytesIO):
+    """A file that returns fewer bytes than asked for, as some streams do."""
+
+    def read(self, size=-1):
+        return super().read(min(size, 1000) if size and size > 0 else size)
+
+def encode(data: bytes, file=None, size=None):
+    file = file or io.BytesIO(data)
+    upload = UploadFile(file=file, size=len(data) if size is None else size)
+    return asyncio.run(image_to_base64(upload))
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, BASE64_RAW_CHUNK - 1, BASE64_RAW_CHUNK, 2 * BASE64_RAW_CHUNK + 1])
+def test_image_to_base64_matches_single_shot_encoding(size):
+    data = os.urandom(size)
+    encoded = encode(data)
+    assert bytes(encoded) == base64.b64encode(data)
+    assert len(encoded) == encoded_base64_length(size)
+
+def test_image_to_base64_pads_only_at_the_end_with_short_reads():
+    data = os.urandom(BASE64_RAW_CHUNK + 5)
+    assert bytes(encode(data, file=ShortReads(data))) == base64.b64encode(data)
+
+def test_image_to_base64_rejects_uploads_that_differ_from_their_declared_size():
+    data = os.urandom(100)
+    with pytest.raises(ValueError):
+        encode(data, size=99)
+    with pytest.raises(ValueError):
+        encode(data, size=103)
+
+@pytest.mark.parametrize("text, valid", [
+    ("", True),
+    ("QUJD", True),
+    ("QUI=", True),
+    ("QQ==", True),
+    ("QUJ", False),
+    ("QQ=", False),
+    ("Q===", False),
+    ("QQ==QUJD", False),
+    ("QU*D", False),
+    ("QUJD" * 20000 + "QUJ", False),
+])
+def test_is_valid_base64(text, valid):
+    assert is_valid_base64(text) is valid
+
+def test_valid_text_decodes_without_error():
+    for text in ("", "QUJD", "QUI=", "QQ=="):
+        assert b"".join(base64_to_chunks(text)) == base64.b64decode(text)
+
+def test_decoded_base64_length_matches_decoded_data():
+    for size in range(10):
+        text = base64.b64encode(os.urandom(size)).decode()
+        assert decoded_base64_length(text) == size
+
+def test_decoded_base64_length_rejects_unpadded_text():
+    with pytest.raises(ValueError):
+        decoded_base64_length("QUJ")
+
+def test_base64_to_chunks_decodes_large_text_in_chunks():
+    data = os.urandom(3 * BASE64_RAW_CHUNK + 10)
+    text = base64.b64encode(data).decode()
+    chunks = list(base64_to_chunks(text))
+    assert len(chunks) == -(-len(text) // BASE64_TEXT_CHUNK)
+    assert b"".join(chunks) == data
@@ -0,0 +1,64 @@
+import time
+from app.core.cache import TTLCache, approximate_size
+
+def test_get_returns_stored_value_and_counts_hits_and_misses():
+    cache = TTLCache(max_entries=4, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b", "missing") == "missing"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(max_entries=4, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_per_entry_ttl_of_zero_is_not_stored():
+    cache = TTLCache(max_entries=4, ttl=60)
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+def test_byte_bound_evicts_and_skips_oversized_values():
+    cache = TTLCache(max_entries=100, ttl=60, max_bytes=100, sizeof=len)
+    cache.set("a", "x" * 60)
+    cache.set("b", "y" * 60)
+    assert cache.get("a") is None
+    assert cache.stats()['bytes'] == 60
+    cache.set("c", "z" * 101)
+    assert cache.get("c") is None
+
+def test_zero_max_entries_disables_cache():
+    cache = TTLCache(max_entries=0, ttl=60)
+    cache.set("a", 1)
+    assert not cache.enabled
+    assert cache.get("a") is None
+
+def test_get_first_counts_one_lookup():
+    cache = TTLCache(max_entries=4, ttl=60)
+    cache.set("second", 2)
+    assert cache.get_first(["first", "second"]) == ("second", 2)
+    assert cache.get_first(["first", "third"], "none") == (None, "none")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_pop_removes_and_returns_entry():
+    cache = TTLCache(max_entries=10, ttl=60)
+    for i in range(3):
+        cache.set(i, i * 10)
+    assert cache.pop(1) == 10
+    assert cache.pop(1) is None
+    assert sorted(k for k in range(3) if cache.get(k) is not None) == [0, 2]
+
+def test_approximate_size_counts_nested_containers():
+    assert approximate_size({"a": [1, 2, 3]}) > approximate_size({})
@@ -0,0 +1,47 @@
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from app.services.color_analysis import analyze_dominant_colors, kmeans_colors, load_pixels
+
+def test_kmeans_finds_separated_clusters_largest_first():
+    pixels = np.array([[250, 0, 0]] * 30 + [[0, 0, 250]] * 10, dtype=np.float32)
+    centers, counts = kmeans_colors(pixels, k=2)
+    np.testing.assert_allclose(centers, [[250, 0, 0], [0, 0, 250]])
+    assert counts.tolist() == [30, 10]
+
+def test_kmeans_limits_k_to_distinct_colors():
+    pixels = np.array([[10, 20, 30]] * 5, dtype=np.float32)
+    centers, counts = kmeans_colors(pixels, k=10)
+    assert len(centers) == 1
+    assert counts.tolist() == [5]
+
+def test_kmeans_handles_no_pixels():
+    centers, counts = kmeans_colors(np.empty((0, 3), dtype=np.float32))
+    assert centers.shape == (0, 3)
+    assert counts.shape == (0,)
+
+def test_kmeans_is_deterministic():
+    pixels = np.random.default_rng(1).integers(0, 256, (500, 3)).astype(np.float32)
+    first = kmeans_colors(pixels, k=4)
+    second = kmeans_colors(pixels, k=4)
+    np.testing.assert_array_equal(first[0], second[0])
+
+def test_load_pixels_downsamples():
+    buffer = BytesIO()
+    Image.new("RGB", (256, 128), (1, 2, 3)).save(buffer, format="PNG")
+    pixels = load_pixels(buffer.getvalue(), sample_edge=32)
+    assert pixels.shape == (32 * 16, 3)
+
+def test_analyze_dominant_colors_matches_vision_shape():
+    image = Image.new("RGB", (40, 40), (200, 10, 10))
+    image.paste((10, 10, 200), (0, 0, 40, 10))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+
+    colors = analyze_dominant_colors(buffer.getvalue(), k=2)
+    assert [c['color'] for c in colors] == [
+        {'red': 200.0, 'green': 10.0, 'blue': 10.0},
+        {'red': 10.0, 'green': 10.0, 'blue': 200.0},
+    ]
+    assert [c['percentRounded'] for c in colors] == [75, 25]
+    assert abs(sum(c['score'] for c in colors) - 1.0) < 1e-9
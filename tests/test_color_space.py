@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from app.services import color_space
+
+@pytest.mark.parametrize("rgb, lab", [
+    ((255, 255, 255), (100.0, 0.0, 0.0)),
+    ((0, 0, 0), (0.0, 0.0, 0.0)),
+    ((255, 0, 0), (53.24, 80.09, 67.20)),
+    ((0, 255, 0), (87.73, -86.18, 83.18)),
+    ((0, 0, 255), (32.30, 79.19, -107.86)),
+])
+def test_srgb_to_lab_matches_reference_values(rgb, lab):
+    np.testing.assert_allclose(color_space.srgb_to_lab(np.array(rgb)), lab, atol=0.01)
+
+@pytest.mark.parametrize("lab1, lab2, expected", [
+    # CIE94 (graphic arts) values for the Sharma, Wu and Dalal test pairs
+    ((50.0, 2.6772, -79.7751), (50.0, 0.0, -82.7485), 1.3950),
+    ((50.0, 3.1571, -77.2803), (50.0, 0.0, -82.7485), 1.9341),
+    ((50.0, -1.3802, -84.2814), (50.0, 0.0, -82.7485), 0.6845),
+])
+def test_delta_e_94_matches_reference_values(lab1, lab2, expected):
+    assert color_space.delta_e_94(np.array(lab1), np.array(lab2)) == pytest.approx(expected, abs=1e-4)
+
+def test_delta_e_94_of_identical_colors_is_zero():
+    lab = color_space.srgb_to_lab(np.array([[12, 34, 56], [200, 100, 50]]))
+    np.testing.assert_allclose(color_space.delta_e_94(lab, lab), 0.0)
+
+def test_lookup_table_stays_close_to_exact_conversion():
+    rgb = np.random.default_rng(0).integers(0, 256, (5000, 3))
+    distances = color_space.delta_e_94(
+        color_space.srgb_to_lab(rgb),
+        color_space.rgb_to_lab(rgb).astype(np.float64)
+    )
+    assert distances.max() < 6.0
+
+def test_rgb_to_keyword_uses_nearest_palette_color():
+    rgb = np.array([[200, 30, 35], [10, 10, 220], [250, 250, 250], [130, 80, 40]])
+    assert color_space.rgb_to_keyword(rgb).tolist() == ["red", "blue", "white", "brown"]
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import httpx
+import pytest
+from app.services.encryption_service import EncryptionService
+
+def make_service(handler, **kwargs):
+    http = SimpleNamespace(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    options = {'max_retries': 2, 'retry_backoff': 0}
+    options.update(kwargs)
+    return EncryptionService(http, "https://furina.test/api/", "secret", **options)
+
+def test_posts_json_with_api_key_and_timeouts():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"text": "abc"})
+
+    service = make_service(handler, connect_timeout=1.5, read_timeout=7)
+    response = asyncio.run(service.encrypt("QUJD", "high"))
+    assert response.json() == {"text": "abc"}
+    request = requests[0]
+    assert str(request.url) == "https://furina.test/api/encrypt"
+    assert request.headers["furina-encryption-service"] == "secret"
+    assert request.extensions["timeout"]["connect"] == 1.5
+    assert request.extensions["timeout"]["read"] == 7
+
+@pytest.mark.parametrize("status_code", [429, 503])
+def test_retries_refused_requests_until_success(status_code):
+    statuses = [status_code, status_code, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0))
+
+    response = asyncio.run(make_service(handler).decrypt("key", "cipher", "iv"))
+    assert response.status_code == 200
+    assert statuses == []
+
+def test_returns_last_refusal_once_retries_run_out():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    response = asyncio.run(make_service(handler, max_retries=1).encrypt("QUJD"))
+    assert response.status_code == 503
+    assert len(calls) == 2
+
+@pytest.mark.parametrize("status_code", [500, 502, 504])
+def test_does_not_retry_responses_the_service_may_have_processed(status_code):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(status_code)
+
+    response = asyncio.run(make_service(handler).encrypt("QUJD"))
+    assert response.status_code == status_code
+    assert len(calls) == 1
+
+@pytest.mark.parametrize("error", [httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout])
+def test_retries_requests_that_were_never_sent(error):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise error("unavailable", request=request)
+
+    with pytest.raises(error):
+        asyncio.run(make_service(handler).encrypt("QUJD"))
+    assert len(calls) == 3
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout, httpx.RemoteProtocolError])
+def test_does_not_retry_requests_that_may_have_been_processed(error):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise error("lost", request=request)
+
+    with pytest.raises(error):
+        asyncio.run(make_service(handler).encrypt("QUJD"))
+    assert len(calls) == 1
+
+def test_concurrent_calls_are_bounded_by_max_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200)
+
+    async def run():
+        service = make_service(handler, max_concurrency=2)
+        return await asyncio.gather(*(service.encrypt("QUJD") for _ in range(6)))
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200] * 6
+    assert peak == 2
+
+def test_encrypt_sends_base64_bytes_as_json_body():
+    bodies = []
+
+    def handler(request):
+        bodies.append((request.headers["content-type"], json.loads(request.content)))
+        return httpx.Response(200)
+
+    asyncio.run(make_service(handler).encrypt(bytearray(b"QUJD"), "high"))
+    assert bodies == [("application/json", {"text": "QUJD", "sensitivity": "high"})]
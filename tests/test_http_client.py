@@ -0,0 +1,22 @@
+import asyncio
+import pytest
+from app.core.http_client import ensure_public_url
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/a.jpg",
+    "http://localhost:8000/a.jpg",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/a.jpg",
+    "http://192.168.1.1/a.jpg",
+    "http://[::1]/a.jpg",
+    "http://[fe80::1]/a.jpg",
+    "http://0.0.0.0/a.jpg",
+    "file:///etc/passwd",
+    "ftp://8.8.8.8/a.jpg",
+])
+def test_ensure_public_url_rejects_non_public_targets(url):
+    with pytest.raises(ValueError):
+        asyncio.run(ensure_public_url(url))
+
+def test_ensure_public_url_accepts_public_address():
+    assert asyncio.run(ensure_public_url("https://8.8.8.8/a.jpg")).host == "8.8.8.8"
@@ -0,0 +1,54 @@
+import hashlib
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from app.services.image_processing import extension_for, prepare_image
+
+def encode(image: Image.Image, image_format: str = "PNG", **params) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+def noisy_image(width: int, height: int) -> Image.Image:
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+def test_large_image_is_downscaled_to_max_edge():
+    content = encode(noisy_image(800, 400))
+    prepared = prepare_image(content, "image/png", max_edge=200)
+
+    with Image.open(BytesIO(prepared.compact)) as compact:
+        assert compact.size == (200, 100)
+    assert prepared.compact_content_type == "image/jpeg"
+    assert prepared.original is content
+    assert prepared.digest == hashlib.sha256(content).hexdigest()
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    content = encode(noisy_image(300, 100), "JPEG", exif=exif, quality=95)
+    prepared = prepare_image(content, "image/jpeg", max_edge=1000, quality=50)
+
+    with Image.open(BytesIO(prepared.compact)) as compact:
+        assert compact.size == (100, 300)
+
+def test_undecodable_content_is_passed_through():
+    prepared = prepare_image(b"not an image", "image/jpeg", digest="abc")
+    assert prepared.compact == b"not an image"
+    assert prepared.compact_content_type == "image/jpeg"
+    assert prepared.digest == "abc"
+
+def test_original_is_kept_when_reencoding_is_not_smaller():
+    content = encode(Image.new("RGB", (8, 8), (10, 20, 30)), "JPEG", quality=10)
+    prepared = prepare_image(content, "image/jpeg", quality=100)
+    assert prepared.compact is content
+
+def test_for_storage_selects_variant():
+    content = encode(noisy_image(800, 400))
+    prepared = prepare_image(content, "image/png", max_edge=200)
+    assert prepared.for_storage("original") == (content, "image/png")
+    assert prepared.for_storage("compact") == (prepared.compact, "image/jpeg")
+
+def test_extension_for_defaults_to_jpg():
+    assert extension_for("image/webp") == "webp"
+    assert extension_for("image/unknown") == "jpg"
@@ -0,0 +1,150 @@
+import random
+import numpy as np
+import pytest
+from app.services import match_scoring
+from app.services.match_scoring import MatchFeatures, rgb_to_keyword_index
+
+# Reference implementation: the per-pair scoring rules score_many replaced
+
+def reference_keyword(red, green, blue):
+    if red > 100 and green > 100 and blue > 100:
+        return "light"
+    elif red > green and red > blue:
+        return "red" if green < 100 and blue < 100 else "brown"
+    elif green > red and green > blue:
+        return "green"
+    elif blue > red and blue > green:
+        return "blue"
+    elif abs(red - green) < 20 and blue < 100:
+        return "yellow"
+    else:
+        return "gray"
+
+def reference_keywords(colors):
+    return list(set(
+        reference_keyword(c['color']['red'], c['color']['green'], c['color']['blue']) for c in colors
+    ))
+
+def reference_label_match(original_labels, result_labels):
+    original_set = set(label['description'] for label in original_labels)
+    result_set = set(label['description'] for label in result_labels)
+    if not original_set:
+        return 0.0
+    return len(original_set.intersection(result_set)) / len(original_set)
+
+def reference_color_match(original_colors, result_colors):
+    original_keywords = reference_keywords(original_colors)
+    result_keywords = reference_keywords(result_colors)
+    if not original_keywords:
+        return 0.0
+    common = [color for color in original_keywords if color in result_keywords]
+    return len(common) / len(original_keywords)
+
+def reference_face_match(original_faces, result_faces):
+    original_set = set((f['roll_angle'], f['tilt_angle'], f['pan_angle']) for f in original_faces)
+    result_set = set((f['roll_angle'], f['tilt_angle'], f['pan_angle']) for f in result_faces)
+    if not original_set or not result_set:
+        return 0.0
+    total_similarity = 0.0
+    for original_face in original_set:
+        similarities = []
+        for result_face in result_set:
+            difference = (
+                abs(original_face[0] - result_face[0])
+                + abs(original_face[1] - result_face[1])
+                + abs(original_face[2] - result_face[2])
+            )
+            similarities.append(max(0.0, 1.0 - (difference / 180.0)))
+        total_similarity += max(similarities)
+    return total_similarity / len(original_set)
+
+def reference_percentage_match(original, result):
+    (original_labels, original_colors, original_faces) = original
+    (result_labels, result_colors, result_faces) = result
+    if not original_labels and not result_labels:
+        label_match = 1.0
+    else:
+        label_match = reference_label_match(original_labels, result_labels)
+    if not original_colors and not result_colors:
+        color_match = 1.0
+    else:
+        color_match = reference_color_match(original_colors, result_colors)
+    if not original_faces and not result_faces:
+        return label_match, color_match, 0.0, (label_match + color_match) / 2
+    face_match = reference_face_match(original_faces, result_faces)
+    return label_match, color_match, face_match, (label_match + color_match + face_match) / 3
+
+def random_analysis(rng):
+    labels = [
+        {'description': rng.choice("abcdefgh"), 'score': rng.random()}
+        for _ in range(rng.randint(0, 5))
+    ]
+    colors = [
+        {
+            'color': {'red': rng.randint(0, 255), 'green': rng.randint(0, 255), 'blue': rng.randint(0, 255)},
+            'score': rng.random(),
+            'percentRounded': rng.randint(0, 100)
+        }
+        for _ in range(rng.randint(0, 5))
+    ]
+    faces = [
+        {
+            'roll_angle': rng.uniform(-90, 90),
+            'tilt_angle': rng.uniform(-90, 90),
+            'pan_angle': rng.uniform(-90, 90)
+        }
+        for _ in range(rng.choice([0, 0, 1, 2, 3]))
+    ]
+    return labels, colors, faces
+
+def test_keyword_index_matches_reference_rules():
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, (5000, 3))
+    expected = [reference_keyword(*map(int, value)) for value in rgb]
+    assert match_scoring.COLOR_KEYWORDS[rgb_to_keyword_index(rgb.astype(np.float64))].tolist() == expected
+
+@pytest.mark.parametrize("seed", range(5))
+def test_score_many_is_identical_to_reference_percentage_match(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        original = random_analysis(rng)
+        candidates = [random_analysis(rng) for _ in range(rng.randint(1, 6))]
+        scores = match_scoring.score_many(
+            MatchFeatures.from_analysis(*original),
+            [MatchFeatures.from_analysis(*candidate) for candidate in candidates]
+        )
+        for row, candidate in zip(scores, candidates):
+            assert tuple(row.tolist()) == reference_percentage_match(original, candidate)
+
+def test_score_of_empty_analyses():
+    empty = MatchFeatures.from_analysis([], [], [])
+    assert match_scoring.score(empty, empty) == (1.0, 1.0, 0.0, 1.0)
+    assert match_scoring.score_many(empty, []).shape == (0, 4)
+
+def test_perceptual_mode_rewards_close_colors():
+    red = [{'color': {'red': 200, 'green': 30, 'blue': 35}, 'score': 1.0}]
+    near_red = [{'color': {'red': 190, 'green': 40, 'blue': 40}, 'score': 1.0}]
+    blue = [{'color': {'red': 20, 'green': 50, 'blue': 220}, 'score': 1.0}]
+    original = MatchFeatures.from_analysis([], red, [])
+    scores = match_scoring.score_many(
+        original,
+        [MatchFeatures.from_analysis([], near_red, []), MatchFeatures.from_analysis([], blue, [])],
+        color_mode="perceptual"
+    )
+    assert scores[0, 1] > 0.5
+    assert scores[1, 1] == 0.0
+
+def test_perceptual_color_match_many():
+    red = [{'color': {'red': 200, 'green': 30, 'blue': 35}, 'score': 1.0}]
+    blue = [{'color': {'red': 20, 'green': 50, 'blue': 220}, 'score': 1.0}]
+    original = MatchFeatures.from_analysis([], red, [])
+    candidates = [
+        MatchFeatures.from_analysis([], red, []),
+        MatchFeatures.from_analysis([], blue, []),
+        MatchFeatures.from_analysis([], blue + red, []),
+        MatchFeatures.from_analysis([], [], []),
+    ]
+    matches = match_scoring.perceptual_color_match_many(original, candidates)
+    assert matches == pytest.approx([1.0, 0.0, 1.0, 0.0])
+    empty = MatchFeatures.from_analysis([], [], [])
+    assert match_scoring.perceptual_color_match_many(empty, candidates).tolist() == [0.0] * 4
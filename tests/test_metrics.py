@@ -0,0 +1,16 @@
+import os
+from app.core.metrics import prepare_multiprocess_dir
+
+def test_prepare_multiprocess_dir_creates_a_directory_when_unset(monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "")
+    path = prepare_multiprocess_dir()
+    assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == path
+    assert os.listdir(path) == []
+    os.rmdir(path)
+
+def test_prepare_multiprocess_dir_clears_stale_metric_files(monkeypatch, tmp_path):
+    (tmp_path / "counter_123.db").write_bytes(b"stale")
+    (tmp_path / "notes.txt").write_text("kept")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert prepare_multiprocess_dir() == str(tmp_path)
+    assert os.listdir(tmp_path) == ["notes.txt"]
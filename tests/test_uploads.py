@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import io
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.core.uploads import UploadSizeLimitMiddleware, read_image_upload, sniff_image_type
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(200))
+
+def read(data: bytes, max_bytes: int = 1024, chunk_size: int = 7, declared_size=None):
+    upload = UploadFile(file=io.BytesIO(data), size=declared_size)
+    return asyncio.run(read_image_upload(upload, max_bytes, chunk_size))
+
+@pytest.mark.parametrize("header, expected", [
+    (b"\xff\xd8\xff\xe0" + bytes(12), 'image/jpeg'),
+    (b"\x89PNG\r\n\x1a\n" + bytes(8), 'image/png'),
+    (b"GIF89a" + bytes(10), 'image/gif'),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", 'image/webp'),
+    (b"MM\x00*" + bytes(12), 'image/tiff'),
+    (b"%PDF-1.7" + bytes(8), None),
+    (b"", None),
+])
+def test_sniff_image_type(header, expected):
+    assert sniff_image_type(header) == expected
+
+def test_read_image_upload_joins_chunks_and_hashes_content():
+    upload = read(PNG)
+    assert upload.content == PNG
+    assert upload.content_type == 'image/png'
+    assert upload.digest == hashlib.sha256(PNG).hexdigest()
+    assert upload.size == len(PNG)
+
+def test_read_image_upload_sniffs_header_split_across_chunks():
+    assert read(PNG, chunk_size=3).content_type == 'image/png'
+
+def test_read_image_upload_sniffs_files_shorter_than_sniff_window():
+    assert read(b"\xff\xd8\xff\xdb").content_type == 'image/jpeg'
+
+def test_read_image_upload_rejects_non_images():
+    with pytest.raises(HTTPException) as error:
+        read(b"not an image, just some text")
+    assert error.value.status_code == 400
+
+def test_read_image_upload_rejects_oversized_content_while_reading():
+    with pytest.raises(HTTPException) as error:
+        read(PNG, max_bytes=100)
+    assert error.value.status_code == 413
+
+def test_read_image_upload_rejects_declared_size_before_reading():
+    with pytest.raises(HTTPException) as error:
+        read(PNG, max_bytes=100, declared_size=101)
+    assert error.value.status_code == 413
+
+def make_client():
+    async def upload(request):
+        body = await request.body()
+        return PlainTextResponse(str(len(body)))
+    app = Starlette(routes=[Route("/upload", upload, methods=["POST"]), Route("/other", upload, methods=["POST"])])
+    return TestClient(UploadSizeLimitMiddleware(app, limits={"/upload": 10}))
+
+def test_size_limit_middleware_rejects_declared_oversized_body():
+    response = make_client().post("/upload", content=b"x" * 11)
+    assert response.status_code == 413
+    assert "10 bytes" in response.json()["detail"]
+
+def test_size_limit_middleware_passes_requests_within_limit_and_other_paths():
+    client = make_client()
+    assert client.post("/upload", content=b"x" * 10).text == "10"
+    assert client.post("/other", content=b"x" * 11).text == "11"